@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+
+# Startup-time benchmark for the serein entry point.
+# Usage: python3 benchmarks/startup.py [--runs N] [--max-ms MS] [-- serein args...]
+# Exits non-zero when the median wall time exceeds --max-ms, so it can guard against regressions.
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SEREIN_PY = os.path.join(REPO_ROOT, "functions", "serein.py")
+VENV_PYTHON = os.path.join(REPO_ROOT, ".venv", "bin", "python3")
+
+# Default budget for the median. 'serein config list' measures about 170 ms, most of it
+# importing typer, so this leaves headroom for slower machines while still catching an
+# eager import of asyncio, rich or a command module.
+MAX_MS = 250.0
+
+
+def time_run(python, args, env):
+    start = time.perf_counter()
+    subprocess.run([python, SEREIN_PY, *args], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return (time.perf_counter() - start) * 1000
+
+
+def import_breakdown(python, args, env):
+    """Returns the slowest top-level imports as reported by -X importtime."""
+    result = subprocess.run(
+        [python, "-X", "importtime", SEREIN_PY, *args],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if name.startswith(" ") and not name.startswith("  "):  # top-level imports only
+            try:
+                rows.append((int(cumulative.strip()) / 1000, name.strip()))
+            except ValueError:
+                continue
+    return sorted(rows, reverse=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure serein startup latency.")
+    parser.add_argument("--runs", type=int, default=20, help="number of timed runs")
+    parser.add_argument("--max-ms", type=float, default=MAX_MS, help="fail when the median exceeds this")
+    parser.add_argument("--python", default=VENV_PYTHON if os.path.exists(VENV_PYTHON) else sys.executable)
+    parser.add_argument("--imports", action="store_true", help="also print the slowest imports")
+    parser.add_argument("serein_args", nargs="*", default=["config", "list"])
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    time_run(args.python, args.serein_args, env)  # Warm the page cache and bytecode
+
+    samples = [time_run(args.python, args.serein_args, env) for _ in range(args.runs)]
+    samples.sort()
+    median = statistics.median(samples)
+    p90 = samples[min(len(samples) - 1, int(len(samples) * 0.9))]
+
+    print(f"serein {' '.join(args.serein_args)}: median {median:.1f} ms, p90 {p90:.1f} ms, min {samples[0]:.1f} ms ({args.runs} runs)")
+
+    if args.imports:
+        for ms, name in import_breakdown(args.python, args.serein_args, env)[:10]:
+            print(f"  {ms:8.1f} ms  {name}")
+
+    if median > args.max_ms:
+        print(f"FAIL: median {median:.1f} ms exceeds budget of {args.max_ms:.1f} ms", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
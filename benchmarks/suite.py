@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+
+# End-to-end benchmark suite for the serein CLI.
+#
+# Builds a throwaway HOME with a persistent install cloned from a local bare remote,
+# synthetic config trees and wallpapers of configurable size, and fake hyprpm, hyprctl and
+# paru executables on PATH, then drives the real commands from this working tree.
+# Every scenario reports wall time plus the I/O of the command and all of its children,
+# read from /proc/self/io (reaped children are accounted to the parent): bytes written,
+# read()/write() syscalls and, when strace is installed and --strace is given, the total
+# syscall count. Results are written as JSON and can be compared against a baseline
+# taken at another commit; the comparison exits non-zero on a regression.
+#
+# Usage: python3 benchmarks/suite.py [--files N] [--generations N] [--wallpapers N]
+#                                    [--output results.json] [--baseline old.json]
+
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+VENV_PYTHON = os.path.join(REPO_ROOT, ".venv", "bin", "python3")
+sys.path.insert(0, os.path.join(REPO_ROOT, "functions"))
+
+from resymlink import CONFIGS_EXTRA, CONFIGS_MINIMAL  # noqa: E402
+
+FAKE_BINARIES = {
+    "hyprpm": """#!/bin/sh
+echo "hyprpm $*" >> "$SEREIN_BENCH_LOG"
+if [ "$1" = "list" ]; then
+    printf 'Repository hyprtasking:\\n  Plugin hyprtasking\\n    enabled: false\\n'
+fi
+""",
+    "hyprctl": """#!/bin/sh
+echo "hyprctl $*" >> "$SEREIN_BENCH_LOG"
+echo ok
+""",
+    "paru": """#!/bin/sh
+echo "paru $*" >> "$SEREIN_BENCH_LOG"
+""",
+}
+
+# Lower is better for every metric; I/O metrics are deterministic enough for a tight tolerance.
+# (write_bytes from /proc is left out: it depends on when the page cache is written back.)
+METRICS = ("wall_ms", "wchar", "syscr", "syscw", "syscalls")
+TIME_METRICS = ("wall_ms",)
+
+
+# --- Fixture ---
+
+def git(cwd, *args):
+    subprocess.run(["git", "-C", cwd, *args], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def write_file(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+class Fixture:
+    def __init__(self, root, args):
+        self.root = root
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.home = os.path.join(root, "home")
+        self.remote = os.path.join(root, "remote.git")
+        self.work = os.path.join(root, "work")
+        self.persistent_dir = os.path.join(self.home, ".cache", "serein")
+        self.bin_dir = os.path.join(root, "bin")
+        self.commits = 0
+
+    def env(self):
+        env = {key: value for key, value in os.environ.items() if not key.startswith(("SEREIN_", "HYPRLAND_", "XDG_"))}
+        env.update({
+            "HOME": self.home,
+            "PATH": f"{self.bin_dir}:{os.environ.get('PATH', '/usr/bin:/bin')}",
+            "XDG_RUNTIME_DIR": os.path.join(self.root, "run"),
+            "SEREIN_BENCH_LOG": os.path.join(self.root, "fake-calls.log"),
+            "GIT_AUTHOR_NAME": "bench", "GIT_AUTHOR_EMAIL": "bench@localhost",
+            "GIT_COMMITTER_NAME": "bench", "GIT_COMMITTER_EMAIL": "bench@localhost",
+        })
+        return env
+
+    def build(self):
+        for name, script in FAKE_BINARIES.items():
+            write_file(os.path.join(self.bin_dir, name), script.encode())
+            os.chmod(os.path.join(self.bin_dir, name), 0o755)
+        os.makedirs(os.path.join(self.root, "run"))
+        os.makedirs(os.path.join(self.home, ".config"))
+
+        subprocess.run(["git", "init", "-q", "--bare", self.remote], check=True)
+        subprocess.run(["git", "init", "-q", self.work], check=True)
+
+        # The CLI under test is this working tree; configs and assets are synthetic
+        for entry in ("functions", "serein"):
+            source = os.path.join(REPO_ROOT, entry)
+            if os.path.isdir(source):
+                shutil.copytree(source, os.path.join(self.work, entry), ignore=shutil.ignore_patterns("__pycache__"))
+            else:
+                shutil.copy2(source, os.path.join(self.work, entry))
+        for cfg in CONFIGS_MINIMAL + CONFIGS_EXTRA:
+            for i in range(self.args.files):
+                size = self.rng.randint(200, 4000)
+                write_file(os.path.join(self.work, "config", cfg, f"dir{i % 8}", f"file{i}.conf"), self.rng.randbytes(size))
+        for i in range(self.args.wallpapers):
+            write_file(os.path.join(self.work, "assets", "Wallpapers", f"wall{i}.png"), self.rng.randbytes(self.args.wallpaper_kb * 1024))
+        write_file(os.path.join(self.work, "assets", "packages.minimal"), b"hyprland waybar rofi\n")
+        self.commit("initial")
+        git(self.work, "push", "-q", self.remote, "HEAD:refs/heads/master")
+
+        subprocess.run(["git", "clone", "-q", self.remote, self.persistent_dir], check=True, env=self.env())
+        open(os.path.join(self.persistent_dir, ".full_install"), "w").close()
+        self.serein("config", "enable", "hypr") # Creates 'current' and links a first config
+
+    def commit(self, message):
+        git(self.work, "add", "-A")
+        subprocess.run(["git", "-C", self.work, "commit", "-q", "-m", message], check=True, env=self.env())
+        self.commits += 1
+
+    def push_change(self, changed_files):
+        """Rewrites a few config files in the remote, as an upstream change would."""
+        for _ in range(changed_files):
+            cfg = self.rng.choice(CONFIGS_MINIMAL)
+            i = self.rng.randrange(self.args.files)
+            write_file(os.path.join(self.work, "config", cfg, f"dir{i % 8}", f"file{i}.conf"), self.rng.randbytes(1024))
+        self.commit(f"change {self.commits}")
+        git(self.work, "push", "-q", self.remote, "HEAD:refs/heads/master")
+        # Force a real fetch instead of reusing the one recorded by the previous update
+        try:
+            os.remove(os.path.join(self.home, ".cache", "serein_state", "update_check.json"))
+        except FileNotFoundError:
+            pass
+
+    def serein_argv(self, *args):
+        return [self.args.python, os.path.join(self.persistent_dir, "functions", "serein.py"), *args]
+
+    def python_argv(self, code):
+        return [self.args.python, "-c", code]
+
+    def serein(self, *args):
+        subprocess.run(self.serein_argv(*args), check=True, env=self.env(), cwd=self.persistent_dir,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+# --- Measurement ---
+
+def read_io():
+    with open("/proc/self/io", "r") as f:
+        return {key: int(value) for key, value in (line.split(": ") for line in f if line.strip())}
+
+
+def count_syscalls(argv, env, cwd):
+    """Runs argv under 'strace -f -c' and returns the total number of syscalls."""
+    with tempfile.NamedTemporaryFile("r", suffix=".strace") as out:
+        subprocess.run(["strace", "-f", "-c", "-o", out.name, *argv], env=env, cwd=cwd,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        for line in out.read().splitlines():
+            fields = line.split()
+            if fields and fields[-1] == "total":
+                return int(fields[3]) # % time, seconds, usecs/call, calls[, errors], total
+    return None
+
+
+def measure(argv, env, cwd):
+    before = read_io()
+    start = time.perf_counter()
+    result = subprocess.run(argv, env=env, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    wall_ms = (time.perf_counter() - start) * 1000
+    after = read_io()
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(argv)} failed ({result.returncode}):\n{result.stderr}")
+    sample = {"wall_ms": wall_ms}
+    for key in ("wchar", "syscr", "syscw"):
+        sample[key] = after[key] - before[key]
+    sample["syscalls"] = None
+    return sample
+
+
+# --- Scenarios ---
+# Each scenario returns (argv, prepare) where prepare runs untimed before every sample.
+
+def scenario_config_list(fixture):
+    return fixture.serein_argv("config", "list"), None
+
+
+def scenario_relink(fixture):
+    code = (
+        "import resymlink;"
+        f"p = {fixture.persistent_dir!r};"
+        "resymlink.unsymlink_configs(p); resymlink.symlink_configs(p)"
+    )
+    return fixture.python_argv(code), None
+
+
+def scenario_reconcile_noop(fixture):
+    code = f"import resymlink; resymlink.reconcile_configs({fixture.persistent_dir!r})"
+    return fixture.python_argv(code), None
+
+
+def scenario_update(fixture):
+    return fixture.serein_argv("update"), lambda: fixture.push_change(fixture.args.changed)
+
+
+def scenario_rollback(fixture):
+    # The interactive prompts cannot be driven from here, so this runs what
+    # 'serein rollback' does after its prompts: prepare the inactive slot and flip to it
+    code = (
+        "from commands import slots, utils;"
+        "generation = utils.get_journal().latest();"
+        "slot = slots.inactive_slot(); slots.prepare_slot(slot, generation); slots.activate_slot(slot)"
+    )
+    return fixture.python_argv(code), None
+
+
+SCENARIOS = {
+    "config_list": scenario_config_list,
+    "relink": scenario_relink,
+    "reconcile_noop": scenario_reconcile_noop,
+    "update": scenario_update,
+    "rollback": scenario_rollback,
+}
+
+
+def run_scenario(fixture, name, runs, use_strace):
+    argv, prepare = SCENARIOS[name](fixture)
+    env = fixture.env()
+    cwd = os.path.join(fixture.persistent_dir, "functions")
+    samples = []
+    for _ in range(runs):
+        if prepare:
+            prepare()
+        sample = measure(argv, env, cwd)
+        if use_strace:
+            if prepare:
+                prepare()
+            sample["syscalls"] = count_syscalls(argv, env, cwd)
+        samples.append(sample)
+
+    summary = {"runs": runs}
+    for metric in METRICS:
+        values = [sample[metric] for sample in samples if sample[metric] is not None]
+        if values:
+            summary[metric] = {"median": statistics.median(values), "min": min(values), "max": max(values)}
+    return summary
+
+
+# --- Reporting ---
+
+def repo_revision():
+    try:
+        revision = subprocess.run(["git", "-C", REPO_ROOT, "rev-parse", "--short", "HEAD"],
+                                  capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "-C", REPO_ROOT, "status", "--porcelain", "--untracked-files=no"],
+                               capture_output=True, text=True).stdout.strip()
+        return revision + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results):
+    for name, summary in results["scenarios"].items():
+        parts = [f"{summary['wall_ms']['median']:8.1f} ms"]
+        for metric in ("wchar", "syscr", "syscw", "syscalls"):
+            if metric in summary:
+                parts.append(f"{metric} {summary[metric]['median']:.0f}")
+        print(f"{name:<16} {'  '.join(parts)}")
+
+
+def compare(results, baseline, tolerance, time_tolerance):
+    """Prints the change of every median against the baseline. Returns the regressions."""
+    regressions = []
+    print(f"\nAgainst baseline {baseline['meta'].get('revision')}:")
+    for name, summary in results["scenarios"].items():
+        old = baseline["scenarios"].get(name)
+        if not old:
+            continue
+        for metric in METRICS:
+            if metric not in summary or metric not in old:
+                continue
+            new_value, old_value = summary[metric]["median"], old[metric]["median"]
+            change = (new_value - old_value) / old_value if old_value else (0.0 if new_value == old_value else float("inf"))
+            allowed = time_tolerance if metric in TIME_METRICS else tolerance
+            flag = "  REGRESSION" if change > allowed else ""
+            if flag or abs(change) > 0.01:
+                print(f"  {name:<16} {metric:<12} {old_value:12.1f} -> {new_value:12.1f} ({change:+.1%}){flag}")
+            if flag:
+                regressions.append((name, metric, change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark serein commands against a synthetic install.")
+    parser.add_argument("--python", default=VENV_PYTHON if os.path.exists(VENV_PYTHON) else sys.executable)
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--runs", type=int, default=5, help="timed samples per scenario")
+    parser.add_argument("--files", type=int, default=200, help="files per synthetic config directory")
+    parser.add_argument("--wallpapers", type=int, default=20, help="number of synthetic wallpapers")
+    parser.add_argument("--wallpaper-kb", type=int, default=512, help="size of each wallpaper")
+    parser.add_argument("--generations", type=int, default=20, help="generations created before measuring")
+    parser.add_argument("--changed", type=int, default=1, help="files changed upstream per measured update")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--strace", action="store_true", help="also count all syscalls with 'strace -f -c'")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", help="compare against results written by an earlier --output")
+    parser.add_argument("--tolerance", type=float, default=0.05, help="allowed relative increase of I/O metrics")
+    parser.add_argument("--time-tolerance", type=float, default=0.25, help="allowed relative increase of wall time")
+    parser.add_argument("--keep", action="store_true", help="keep the temporary HOME for inspection")
+    args = parser.parse_args()
+
+    if args.strace and not shutil.which("strace"):
+        parser.error("--strace needs strace on PATH")
+
+    root = tempfile.mkdtemp(prefix="serein-bench-")
+    try:
+        fixture = Fixture(root, args)
+        fixture.build()
+        for _ in range(args.generations):
+            fixture.push_change(args.changed)
+            fixture.serein("update")
+
+        results = {
+            "meta": {
+                "revision": repo_revision(),
+                "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "python": args.python,
+                "params": {key: getattr(args, key) for key in ("runs", "files", "wallpapers", "wallpaper_kb", "generations", "changed", "seed", "strace")},
+            },
+            "scenarios": {name: run_scenario(fixture, name, args.runs, args.strace) for name in args.scenarios},
+        }
+    finally:
+        if args.keep:
+            print(f"Fixture kept at {root}")
+        else:
+            shutil.rmtree(root, ignore_errors=True)
+
+    print_results(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        if baseline["meta"].get("params") != results["meta"]["params"]:
+            print("Warning: the baseline was taken with different parameters.", file=sys.stderr)
+        if compare(results, baseline, args.tolerance, args.time_tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
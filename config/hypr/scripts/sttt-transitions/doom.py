@@ -0,0 +1,63 @@
+# doom: the screen melts downwards, each column following the nearest of a few random sinks
+
+import random
+from dataclasses import dataclass
+
+import sttt
+from sttt import Transition, register, set_pix
+
+
+@register
+class Doom(Transition):
+    @dataclass
+    class Options:
+        seed: int = -1
+        _seed_help = """seed for the layout of the sinks, negative picks a random one"""
+
+    def __init__(self, *args, **kwargs):
+        self.random_seed = random.randrange(2**32)
+        super().__init__(*args, **kwargs)
+
+    @classmethod
+    def cacheable(cls, options):
+        return options.seed >= 0
+
+    def update_dim(self):
+        super().update_dim()
+        width = self.width
+        height = self.height
+        seed = self.options.seed if self.options.seed >= 0 else self.random_seed
+        rng = random.Random(seed)
+
+        # columns where the screen falls fastest, and how fast
+        self.sink = {rng.randint(1, width): rng.randint(5, 10) / 10 for i in range(max(1, width // 2))}
+        max_speed = max(self.sink.values())
+        self.time_shift = 1 - max_speed
+
+        # every column falls with its nearest sink, slowed by its distance from it
+        sinks = sorted(self.sink)
+        nearest = []
+        i = 0
+        for x in range(width):
+            while i < len(sinks) and sinks[i] <= x:
+                i += 1
+            left = sinks[i - 1] if i > 0 else None
+            right = sinks[i] if i < len(sinks) else None
+            if right is None or (left is not None and x - left <= right - x):
+                nearest.append(left)
+            else:
+                nearest.append(right)
+        self.fall = [
+            height / self.sink[sink] + abs(x - sink) / max_speed
+            for x, sink in enumerate(nearest)
+        ]
+        if sttt.np is not None:
+            self.fall_array = sttt.np.array(self.fall)
+
+    def mask(self, time, bezier_time):
+        top = sttt.np.floor((bezier_time + self.time_shift) * self.fall_array)
+        return self.ys >= top
+
+    def draw(self, x, y, time, bezier_time):
+        offset = (bezier_time + self.time_shift) * self.fall[x]
+        set_pix(self.screen, x, int(y + offset), color=self.color)
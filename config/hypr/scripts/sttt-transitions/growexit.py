@@ -0,0 +1,50 @@
+# growexit: a circle grows to cover the screen, then a hole grows from a second center
+
+from dataclasses import dataclass
+
+from sttt import RadialField, RadialTransition, register
+
+
+@register
+class GrowExit(RadialTransition):
+    center_x: int
+    center_y: int
+
+    center_x2: int
+    center_y2: int
+
+    @dataclass
+    class Options:
+        center: tuple[float, float] = (0.5, 0.5)
+        _center_help = """center of the first circle"""
+        center2: tuple[float, float] = (-1, -1)
+        _center2_help = """center of the second circle, if negative, defaults to same coord as first circle"""
+        second_start: float = 0.5
+        _second_start_help = """when the second circle starts to grow and the first circle ends as a ratio between 0 and 1"""
+
+    def fields(self):
+        self.center_x = self.width * self.options.center[0]
+        self.center_y = self.height * self.options.center[1]
+        self.center_x2 = (
+            self.center_x
+            if self.options.center2[0] < 0
+            else self.width * self.options.center2[0]
+        )
+        self.center_y2 = (
+            self.center_y
+            if self.options.center2[1] < 0
+            else self.height * self.options.center2[1]
+        )
+        self.field = RadialField(self.width, self.height, self.center_x, self.center_y)
+        if (self.center_x2, self.center_y2) == (self.center_x, self.center_y):
+            self.field2 = self.field
+        else:
+            self.field2 = RadialField(self.width, self.height, self.center_x2, self.center_y2)
+
+    def lit(self, bezier_time):
+        second_start = self.options.second_start
+        if bezier_time < second_start:
+            return self.field.inside(bezier_time / second_start * self.field.max_dist)
+        return self.field2.outside(
+            (bezier_time - second_start) / (1 - second_start) * self.field2.max_dist
+        )
@@ -0,0 +1,63 @@
+# scanline: a line that sweeps across the screen, widening towards the middle of its path
+
+from dataclasses import dataclass
+
+import sttt
+from sttt import Transition, register, set_pix
+
+
+@register
+class ScanLine(Transition):
+    @dataclass
+    class Options:
+        vertical: bool = True
+        _vertical_help = """vertical scanline :0"""
+        reverse: bool = False
+        _reverse_help = """start from the bottom/right"""
+        width: int = 2
+        _width_help = """width of the scanline"""
+        scale_width: float = 1.1
+        _scale_width_help = """width is increased by this amount as 'scale_ratio' is reached"""
+        scale_ratio: float = 0.5
+        _scale_ratio_help = """ratio where the width of scanline is maximum"""
+
+    def band(self, bezier_time):
+        """thickness, eased position and path length of the scanline"""
+        width = self.width
+        height = self.height
+
+        vertical = self.options.vertical
+        reverse = self.options.reverse
+        thickness = self.options.width
+
+        scale_width = self.options.scale_width - 1
+        scale_ratio = self.options.scale_ratio
+
+        path = [height, width][vertical]
+
+        if bezier_time <= scale_ratio:
+            thickness = thickness + scale_width * path * bezier_time / scale_ratio
+        else:
+            thickness = thickness + scale_width * path * (
+                (1 - bezier_time) / (1 - scale_ratio)
+            )
+
+        if reverse:
+            bezier_time = 1 - bezier_time
+
+        if not vertical:
+            thickness /= 2
+
+        return thickness, bezier_time, path
+
+    def mask(self, time, bezier_time):
+        thickness, bezier_time, path = self.band(bezier_time)
+        pix_pos = self.xs if self.options.vertical else self.ys
+        return sttt.np.abs(pix_pos + thickness - (path + thickness * 2) * bezier_time) < thickness
+
+    def draw(self, x, y, time, bezier_time):
+        thickness, bezier_time, path = self.band(bezier_time)
+        pix_pos = [y, x][self.options.vertical]
+
+        if abs(pix_pos + thickness - (path + thickness * 2) * bezier_time) < thickness:
+            set_pix(self.screen, x, y, color=self.color)
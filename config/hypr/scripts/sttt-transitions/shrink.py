@@ -0,0 +1,24 @@
+# shrink: the screen shrinks into a circle around the center
+
+from dataclasses import dataclass
+
+from sttt import RadialField, RadialTransition, register
+
+
+@register
+class Shrink(RadialTransition):
+    center_x: int
+    center_y: int
+
+    @dataclass
+    class Options:
+        center: tuple[float, float] = (0.5, 0.5)
+        _center_help = """center of the circle as a ratio between 0 and 1"""
+
+    def fields(self):
+        self.center_x = self.width * self.options.center[0]
+        self.center_y = self.height * self.options.center[1]
+        self.field = RadialField(self.width, self.height, self.center_x, self.center_y)
+
+    def lit(self, bezier_time):
+        return self.field.inside((1 - bezier_time) * self.field.max_dist)
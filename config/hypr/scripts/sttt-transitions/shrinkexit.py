@@ -0,0 +1,16 @@
+# shrinkexit: the screen closes in on the center, then a circle shrinks around a second center
+
+from sttt import load_transition, register
+
+GrowExit = load_transition("growexit")  # same options and fields
+
+
+@register
+class ShrinkExit(GrowExit):
+    def lit(self, bezier_time):
+        second_start = self.options.second_start
+        if bezier_time < second_start:
+            return self.field.outside((1 - bezier_time * (1 / second_start)) * self.field.max_dist)
+        return self.field2.inside(
+            (1 - (bezier_time - second_start) / (1 - second_start)) * self.field2.max_dist
+        )
@@ -0,0 +1,96 @@
+import os
+import py_compile
+import shutil
+
+from . import runner, utils
+
+# Precompiled bytecode bundles for the CLI. Instead of deleting __pycache__ after an
+# update (and recompiling on the next few runs), 'serein update' compiles functions/ into
+# a cache dir keyed by the git tree hash of functions/. A bundle is a sourceless .pyc
+# mirror of functions/ (commands/update.py -> commands/update.pyc); the launcher runs its
+# serein.pyc, which puts the bundle first on sys.path for the CLI's own modules only. The
+# stdlib and the venv keep using their regular __pycache__. An update that does not touch
+# the CLI keeps the same bundle, and the launcher falls back to the sources as soon as any
+# of them is newer than the bundle.
+
+COMPLETE_MARKER = ".complete"
+KEEP_BUNDLES = 2 # The active bundle and the one before it
+
+def get_bundles_dir():
+    return os.path.join(utils.get_state_dir(), "bytecode")
+
+def get_pointer_path():
+    """Returns the file the launcher reads the active bundle directory from."""
+    return os.path.join(get_bundles_dir(), "current")
+
+def get_bundle_key(persistent_dir):
+    """Returns the git tree hash of the checked-out functions/ directory."""
+    stdout, _, _ = runner.run(["git", "-C", persistent_dir, "rev-parse", "HEAD:functions"], error_message="Failed to resolve the CLI tree")
+    return stdout
+
+def iter_sources(persistent_dir):
+    """Yields the paths of the CLI's .py files, relative to functions/."""
+    functions_dir = os.path.join(persistent_dir, "functions")
+    for root, dirs, files in os.walk(functions_dir):
+        dirs[:] = [name for name in dirs if name != "__pycache__"]
+        for name in files:
+            if name.endswith(".py"):
+                yield os.path.relpath(os.path.join(root, name), functions_dir)
+
+def is_bundle_current(persistent_dir, bundle_dir):
+    """Checks that a bundle is complete, was built from this checkout and no source is newer than it."""
+    marker = os.path.join(bundle_dir, COMPLETE_MARKER)
+    try:
+        with open(marker, "r") as f:
+            source_dir = f.readline().strip()
+        built_at = os.stat(marker).st_mtime
+    except OSError:
+        return False
+    if source_dir != os.path.realpath(persistent_dir):
+        return False
+    functions_dir = os.path.join(persistent_dir, "functions")
+    return all(os.stat(os.path.join(functions_dir, path)).st_mtime <= built_at for path in iter_sources(persistent_dir))
+
+def build_bundle(persistent_dir, bundle_dir):
+    """Compiles every module of functions/ into a sourceless .pyc at the same relative path in bundle_dir."""
+    tmp_dir = f"{bundle_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    functions_dir = os.path.join(persistent_dir, "functions")
+    for path in iter_sources(persistent_dir):
+        source = os.path.join(functions_dir, path)
+        try:
+            # dfile keeps tracebacks pointing at the source file
+            py_compile.compile(source, cfile=os.path.join(tmp_dir, f"{path}c"), dfile=source, doraise=True)
+        except py_compile.PyCompileError as e:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            utils.error(f"Failed to compile the CLI: {e.msg}")
+    # The marker records the checkout it was built from; the launcher compares it with its own directory
+    with open(os.path.join(tmp_dir, COMPLETE_MARKER), "w") as f:
+        f.write(f"{os.path.realpath(persistent_dir)}\n")
+    shutil.rmtree(bundle_dir, ignore_errors=True)
+    os.rename(tmp_dir, bundle_dir)
+
+def write_pointer(bundle_dir):
+    path = get_pointer_path()
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "w") as f:
+        f.write(f"{bundle_dir}\n")
+    os.replace(tmp_path, path)
+
+def prune_bundles(active_dir):
+    """Removes all but the newest KEEP_BUNDLES bundles, never the active one."""
+    bundles_dir = get_bundles_dir()
+    bundles = [entry for entry in os.scandir(bundles_dir) if entry.is_dir() and entry.path != active_dir]
+    bundles.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in bundles[KEEP_BUNDLES - 1:]:
+        shutil.rmtree(entry.path, ignore_errors=True)
+
+def ensure_bundle(persistent_dir):
+    """Makes the launcher use a bundle for the checked-out CLI, compiling it only if it does not exist yet."""
+    bundle_dir = os.path.join(get_bundles_dir(), get_bundle_key(persistent_dir))
+    os.makedirs(get_bundles_dir(), exist_ok=True)
+    if not is_bundle_current(persistent_dir, bundle_dir):
+        utils.info("Compiling the CLI bytecode bundle...")
+        build_bundle(persistent_dir, bundle_dir)
+    write_pointer(bundle_dir)
+    prune_bundles(bundle_dir)
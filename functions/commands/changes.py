@@ -0,0 +1,86 @@
+import resymlink
+from hypripc import HyprlandIPC, HyprlandIPCError
+from . import bytecode, runner, utils
+
+# Change-scoped updates. The paths that differ between two commits are mapped to the
+# components they belong to (a config directory, the CLI, package lists, ...), so an
+# update only re-links, re-validates and invalidates what actually changed.
+
+CLI = "cli"
+PACKAGES = "packages"
+SHARED_CONFIG = "config"
+OTHER = "other"
+
+def changed_paths(persistent_dir, before_hash, after_hash):
+    """Returns the repository paths that differ between two commits."""
+    stdout, _, _ = runner.run(
+        ["git", "-C", persistent_dir, "diff", "--name-only", "--no-renames", before_hash, after_hash],
+        error_message="Failed to list changed files",
+    )
+    return [path for path in stdout.splitlines() if path]
+
+def component_of(path):
+    """Maps a repository path to the component it belongs to, e.g. 'config/waybar/style.css' -> 'waybar'."""
+    parts = path.split("/")
+    if parts[0] == "config":
+        # Loose files such as config/user.conf are shared and not symlinked on their own
+        return parts[1] if len(parts) > 2 else SHARED_CONFIG
+    if parts[0] == "functions" or path == "serein":
+        return CLI
+    if parts[0] == "assets" and len(parts) > 1 and parts[1].startswith("packages."):
+        return PACKAGES
+    return OTHER
+
+def group_changes(paths):
+    """Groups changed paths into {component: [paths]}."""
+    components = {}
+    for path in paths:
+        components.setdefault(component_of(path), []).append(path)
+    return components
+
+def print_summary(components):
+    """Prints how many files changed per component."""
+    if not components:
+        utils.info("No files changed.")
+        return
+    summary = ", ".join(
+        f"{component} ({len(components[component])} file{'s' if len(components[component]) != 1 else ''})"
+        for component in sorted(components)
+    )
+    utils.info(f"Changed components: {summary}")
+
+def changed_configs(persistent_dir, components):
+    """Returns the managed configs touched by a change."""
+    managed = resymlink.get_configs_to_manage(persistent_dir)
+    return [cfg for cfg in managed if cfg in components]
+
+def validate_hyprland():
+    """Asks a running Hyprland for config errors after its config changed. Silent if Hyprland is not running."""
+    try:
+        reply = HyprlandIPC().request("configerrors").strip()
+    except HyprlandIPCError:
+        return
+    if reply:
+        utils.info(f"Hyprland reports config errors:\n{reply}")
+
+def apply_changes(persistent_dir, components):
+    """Re-links, re-validates and invalidates caches only for the changed components."""
+    configs = changed_configs(persistent_dir, components)
+    if configs:
+        # Symlinks point at whole directories, so edits inside one need no re-link; only
+        # configs whose directory appeared or vanished end up with an action in the plan.
+        utils.info(f"Reconciling changed configurations: {', '.join(configs)}")
+        resymlink.reconcile_configs(persistent_dir, {cfg: True for cfg in configs})
+        for cfg in configs:
+            if resymlink.config_status(persistent_dir, cfg) == resymlink.STATUS_MISSING:
+                utils.info(f"Config '{cfg}' no longer exists in the repository.")
+
+    if "hypr" in configs:
+        validate_hyprland()
+
+    if CLI in components:
+        utils.info("CLI modules changed.")
+        bytecode.ensure_bundle(persistent_dir)
+
+    if PACKAGES in components:
+        utils.info("Package lists changed. Run 'serein pkg status' to see missing packages.")
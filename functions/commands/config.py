@@ -1,17 +1,31 @@
 import os
-import shutil
 import sys
 import typer
-from InquirerPy import inquirer
-from InquirerPy.utils import get_style
+from typing_extensions import Annotated
 
+import daemonclient
 import resymlink
-from . import utils
+from hypripc import HyprlandIPC, HyprlandIPCError
+from . import hyprpm, utils
 
 config_app = typer.Typer(name="config", help="Manage Serein configurations and features.")
 
-def enable_overview():
-    """Enables the Hyprland overview feature (hyprtasking)."""
+STATUS_COLORS = {
+    resymlink.STATUS_ENABLED: typer.colors.GREEN,
+    resymlink.STATUS_EXTERNAL: typer.colors.YELLOW,
+    resymlink.STATUS_UNMANAGED: typer.colors.YELLOW,
+    resymlink.STATUS_DISABLED: typer.colors.WHITE,
+    resymlink.STATUS_MISSING: typer.colors.RED,
+}
+
+FEATURES = ["overview"]
+
+# Configs whose running program has to reload after their symlink changes
+CONFIG_RELOADS = {"hypr": "hyprland", "waybar": "waybar"}
+
+def enable_overview(reload=True):
+    """Enables the Hyprland overview feature (hyprtasking). Without reload, the caller reloads hyprpm and Hyprland."""
+    from . import runner # Pulls in asyncio; only toggles and reloads need it
     if utils.is_overview_enabled():
         utils.info("Overview feature is already enabled.")
         return
@@ -19,29 +33,114 @@ def enable_overview():
     utils.info("Enabling hyprtasking (required for overview)...")
     
     # Check if the repository is added, if not, add it.
-    stdout, _, _ = utils.run_command("hyprpm list", check_error=False)
-    if "Hyprtasking" not in stdout:
+    if not hyprpm.has_repository("hyprtasking"):
         utils.info("Hyprtasking plugin repository not found, adding it...")
-        utils.run_command("hyprpm add https://github.com/raybbian/hyprtasking", error_message="hyprpm add failed")
+        runner.run(["hyprpm", "add", "https://github.com/raybbian/hyprtasking"], stream=True, error_message="hyprpm add failed")
     
-    utils.run_command("hyprpm update", error_message="hyprpm update failed")
-    utils.run_command("hyprpm enable hyprtasking", error_message="hyprpm enable failed")
-    utils.run_command("hyprpm reload -nn", error_message="hyprpm reload failed")
-    utils.run_command("hyprctl reload", error_message="hyprctl reload failed")
+    runner.run(["hyprpm", "update"], stream=True, error_message="hyprpm update failed")
+    runner.run(["hyprpm", "enable", "hyprtasking"], error_message="hyprpm enable failed")
+    hyprpm.invalidate()
+    if reload:
+        run_reloads({"hyprpm", "hyprland"})
     utils.info("Hyprtasking enabled successfully.")
 
-def disable_overview():
-    """Disables the Hyprland overview feature (hyprtasking)."""
+def disable_overview(reload=True):
+    """Disables the Hyprland overview feature (hyprtasking). Without reload, the caller reloads hyprpm and Hyprland."""
+    from . import runner
     if not utils.is_overview_enabled():
         utils.info("Overview feature is already disabled.")
         return
 
     utils.info("Disabling hyprtasking...")
-    utils.run_command("hyprpm disable hyprtasking", error_message="hyprpm disable failed")
-    utils.run_command("hyprpm reload -nn", error_message="hyprpm reload failed")
-    utils.run_command("hyprctl reload", error_message="hyprctl reload failed")
+    runner.run(["hyprpm", "disable", "hyprtasking"], error_message="hyprpm disable failed")
+    hyprpm.invalidate()
+    if reload:
+        run_reloads({"hyprpm", "hyprland"})
     utils.info("Hyprtasking disabled successfully.")
 
+FEATURE_TOGGLES = {"overview": (utils.is_overview_enabled, enable_overview, disable_overview)}
+
+def run_reloads(reloads):
+    """Runs each pending reload once: hyprpm before Hyprland, then waybar."""
+    from . import runner
+    if reloads & {"hyprpm", "hyprland"}:
+        try:
+            ipc = HyprlandIPC()
+        except HyprlandIPCError:
+            ipc = None
+            utils.info("Hyprland is not running; the changes take effect when it starts.")
+        if ipc is not None and "hyprpm" in reloads:
+            runner.run(["hyprpm", "reload", "-nn"], error_message="hyprpm reload failed")
+        if ipc is not None and "hyprland" in reloads:
+            try:
+                ipc.reload()
+            except HyprlandIPCError as e:
+                utils.error(f"Hyprland reload failed: {e}")
+    if "waybar" in reloads:
+        # SIGUSR2 makes waybar reload its config and style; not running is fine
+        runner.run(["pkill", "-SIGUSR2", "-x", "waybar"], check=False)
+
+# --- Declarative Apply ---
+
+def load_manifest(path):
+    """
+    Reads a TOML manifest into (configs, features), both {name: enabled}.
+    Items not listed in the manifest are left as they are.
+    """
+    import tomllib
+
+    try:
+        with open(path, "rb") as f:
+            manifest = tomllib.load(f)
+    except (OSError, tomllib.TOMLDecodeError) as e:
+        utils.error(f"Could not read manifest {path}: {e}")
+
+    known = {"configs": resymlink.CONFIGS_MINIMAL + resymlink.CONFIGS_EXTRA, "features": FEATURES}
+    sections = {}
+    for section, names in known.items():
+        table = manifest.get(section, {})
+        if not isinstance(table, dict):
+            utils.error(f"[{section}] in {path} must be a table of name = true/false.")
+        for name, enabled in table.items():
+            if name not in names:
+                utils.error(f"Unknown {section[:-1]} '{name}' in {path}.")
+            if not isinstance(enabled, bool):
+                utils.error(f"{section}.{name} in {path} must be true or false.")
+        sections[section] = table
+    unknown = set(manifest) - set(known)
+    if unknown:
+        utils.error(f"Unknown section(s) in {path}: {', '.join(sorted(unknown))}")
+    return sections["configs"], sections["features"]
+
+def apply_state(persistent_dir, configs, features, force=False):
+    """
+    Brings configs and features to the desired state in one pass and runs every
+    needed reload once at the end. Returns the number of changes made.
+    """
+    plan = resymlink.plan_configs(persistent_dir, configs, force=force)
+    toggles = [
+        (name, enabled) for name, enabled in features.items()
+        if FEATURE_TOGGLES[name][0]() != enabled
+    ]
+
+    reloads = set()
+    changes = resymlink.apply_plan(plan)
+    for action in plan:
+        # Only a newly linked config is reloaded; a removed one has nothing left to load
+        if action.op in (resymlink.LINK, resymlink.REPLACE) and action.cfg in CONFIG_RELOADS:
+            reloads.add(CONFIG_RELOADS[action.cfg])
+    for name, enabled in toggles:
+        _, enable, disable = FEATURE_TOGGLES[name]
+        if enabled:
+            enable(reload=False)
+        else:
+            disable(reload=False)
+        reloads.update({"hyprpm", "hyprland"})
+        changes += 1
+
+    run_reloads(reloads)
+    return changes
+
 @config_app.command(name="list", help="List all available configurations and their status.")
 def config_list():
     """Lists all available configurations and their status."""
@@ -51,29 +150,23 @@ def config_list():
 
     utils.info("Available Serein Configurations:")
     all_configs = resymlink.CONFIGS_MINIMAL + resymlink.CONFIGS_EXTRA
-    repo_config_dir = os.path.join(utils.get_persistent_dir(), "config")
+    persistent_dir = utils.get_persistent_dir()
+
+    # A running 'serein daemon' already has the answer; otherwise scan directly
+    state = daemonclient.query("configs")
+    if state is not None:
+        statuses = {cfg: info["status"] for cfg, info in state["configs"].items()}
+        overview_enabled = state["overview"]
+    else:
+        statuses = {cfg: resymlink.config_status(persistent_dir, cfg) for cfg in all_configs}
+        overview_enabled = utils.is_overview_enabled()
 
     for cfg in sorted(all_configs):
-        source_path = os.path.join(repo_config_dir, cfg)
-        target_path = os.path.join(resymlink.CONFIG_DIR, cfg)
-        status = ""
-
-        if not os.path.exists(source_path):
-            status = typer.style("source missing", fg=typer.colors.RED)
-        elif os.path.islink(target_path):
-            if os.readlink(target_path) == source_path:
-                status = typer.style("enabled", fg=typer.colors.GREEN)
-            else:
-                status = typer.style("enabled (external)", fg=typer.colors.YELLOW)
-        elif os.path.exists(target_path):
-            status = typer.style("unmanaged", fg=typer.colors.YELLOW)
-        else:
-            status = typer.style("disabled", fg=typer.colors.WHITE)
-        
-        typer.echo(f"- {cfg}: {status}")
+        status = statuses[cfg]
+        typer.echo(f"- {cfg}: {typer.style(status, fg=STATUS_COLORS[status])}")
     
     # Add overview status
-    overview_status = typer.style("enabled", fg=typer.colors.GREEN) if utils.is_overview_enabled() else typer.style("disabled", fg=typer.colors.WHITE)
+    overview_status = typer.style("enabled", fg=typer.colors.GREEN) if overview_enabled else typer.style("disabled", fg=typer.colors.WHITE)
     typer.echo(f"- overview: {overview_status}")
 
 
@@ -93,32 +186,26 @@ def config_enable(config_name: str):
         utils.error(f"Unknown configuration: {config_name}")
         return
 
-    repo_config_dir = os.path.join(utils.get_persistent_dir(), "config")
-    source_path = os.path.join(repo_config_dir, config_name)
+    persistent_dir = utils.get_persistent_dir()
+    status = resymlink.config_status(persistent_dir, config_name)
     target_path = os.path.join(resymlink.CONFIG_DIR, config_name)
 
-    if not os.path.exists(source_path):
+    if status == resymlink.STATUS_MISSING:
         utils.error(f"Source directory not found for {config_name} in the Serein repository.")
         return
 
-    if os.path.islink(target_path) and os.readlink(target_path) == source_path:
+    if status == resymlink.STATUS_ENABLED:
         utils.info(f"Configuration '{config_name}' is already enabled.")
         return
 
-    if os.path.exists(target_path):
+    if status in (resymlink.STATUS_EXTERNAL, resymlink.STATUS_UNMANAGED):
         if not utils.confirm_action(f"Warning: '{target_path}' already exists and is not a Serein symlink. Overwrite it?"):
             utils.info("Enable operation cancelled.")
             return
-        if os.path.islink(target_path):
-            os.remove(target_path)
-        else:
-            shutil.rmtree(target_path)
 
-    try:
-        os.symlink(source_path, target_path)
-        utils.info(f"Successfully enabled configuration: {config_name}")
-    except OSError as e:
-        utils.error(f"Failed to enable configuration {config_name}: {e}")
+    plan = resymlink.plan_configs(persistent_dir, {config_name: True}, force=True)
+    resymlink.apply_plan(plan)
+    utils.info(f"Successfully enabled configuration: {config_name}")
 
 @config_app.command(name="disable", help="Disable a specific configuration or feature.")
 def config_disable(config_name: str):
@@ -131,23 +218,47 @@ def config_disable(config_name: str):
         disable_overview()
         return
 
-    repo_config_dir = os.path.join(utils.get_persistent_dir(), "config")
-    source_path = os.path.join(repo_config_dir, config_name)
-    target_path = os.path.join(resymlink.CONFIG_DIR, config_name)
+    status = resymlink.config_status(utils.get_persistent_dir(), config_name)
 
-    if not os.path.islink(target_path):
+    if status == resymlink.STATUS_EXTERNAL:
+        utils.info(f"Configuration '{config_name}' is a symlink, but it does not point to the Serein repository. It will not be removed.")
+        return
+
+    if status != resymlink.STATUS_ENABLED:
         utils.info(f"Configuration '{config_name}' is not an enabled Serein symlink. Nothing to do.")
         return
 
-    if os.readlink(target_path) != source_path:
-        utils.info(f"Configuration '{config_name}' is a symlink, but it does not point to the Serein repository. It will not be removed.")
+    plan = resymlink.plan_configs(utils.get_persistent_dir(), {config_name: False})
+    resymlink.apply_plan(plan)
+    utils.info(f"Successfully disabled configuration: {config_name}")
+
+@config_app.command(name="apply", help="Apply a TOML manifest of desired configs and features in one pass.")
+def config_apply(
+    manifest: Annotated[str, typer.Argument(help="TOML file with [configs] and [features] tables of name = true/false.")],
+    force: Annotated[bool, typer.Option("--force", "-f", help="Replace existing non-Serein directories in ~/.config.")] = False,
+    dry_run: Annotated[bool, typer.Option("--dry-run", "-n", help="Only print what would change.")] = False
+):
+    """Applies a declarative manifest without prompting."""
+    if not utils.is_persistent_install():
+        utils.error("Configuration management is only available for persistent installations.")
         return
 
-    try:
-        os.remove(target_path)
-        utils.info(f"Successfully disabled configuration: {config_name}")
-    except OSError as e:
-        utils.error(f"Failed to disable configuration {config_name}: {e}")
+    configs, features = load_manifest(manifest)
+    persistent_dir = utils.get_persistent_dir()
+
+    if dry_run:
+        for action in resymlink.plan_configs(persistent_dir, configs, force=force):
+            typer.echo(f"- {action.cfg}: {action.op}")
+        for name, enabled in features.items():
+            if FEATURE_TOGGLES[name][0]() != enabled:
+                typer.echo(f"- {name}: {'enable' if enabled else 'disable'}")
+        return
+
+    changes = apply_state(persistent_dir, configs, features, force=force)
+    if changes == 0:
+        utils.info("Everything already matches the manifest.")
+    else:
+        utils.info(f"Applied {changes} change(s) from {manifest}.")
 
 @config_app.callback(invoke_without_command=True)
 def config_main(ctx: typer.Context):
@@ -155,22 +266,21 @@ def config_main(ctx: typer.Context):
     if ctx.invoked_subcommand is not None:
         return
 
+    from InquirerPy import inquirer
+    from InquirerPy.utils import get_style
+
     if not utils.is_persistent_install():
         utils.error("Configuration management is only available for persistent installations.")
         return
 
-    all_items = resymlink.CONFIGS_MINIMAL + resymlink.CONFIGS_EXTRA + ["overview"]
-    repo_config_dir = os.path.join(utils.get_persistent_dir(), "config")
+    all_configs = resymlink.CONFIGS_MINIMAL + resymlink.CONFIGS_EXTRA
+    all_items = all_configs + ["overview"]
+    persistent_dir = utils.get_persistent_dir()
 
     # Get the current state of all items
-    current_states = {}
-    for item in all_items:
-        if item == "overview":
-            current_states[item] = utils.is_overview_enabled()
-        else:
-            target_path = os.path.join(resymlink.CONFIG_DIR, item)
-            source_path = os.path.join(repo_config_dir, item)
-            current_states[item] = os.path.islink(target_path) and os.readlink(target_path) == source_path
+    statuses = {cfg: resymlink.config_status(persistent_dir, cfg) for cfg in all_configs}
+    current_states = {cfg: status == resymlink.STATUS_ENABLED for cfg, status in statuses.items()}
+    current_states["overview"] = utils.is_overview_enabled()
 
     # Create choices for the interactive prompt
     choices = [
@@ -178,26 +288,36 @@ def config_main(ctx: typer.Context):
     ]
 
     try:
-        selected_items = inquirer.checkbox(
+        selected_items = utils.ask(inquirer.checkbox(
             message="Select configurations to enable/disable (Space to toggle, Enter to confirm):",
             choices=choices,
             cycle=False,
             style=get_style({"pointer": "#86afef bold", "question": "#86afef bold"}),
-        ).execute()
+        ))
 
         if selected_items is None: # User escaped
             utils.info("Configuration change cancelled.")
             return
 
-        # Determine which items to enable and disable
-        for item in all_items:
-            should_be_enabled = item in selected_items
-            is_currently_enabled = current_states[item]
-
-            if should_be_enabled and not is_currently_enabled:
-                config_enable(item)
-            elif not should_be_enabled and is_currently_enabled:
-                config_disable(item)
+        # Only items whose state changes end up in the desired state
+        desired = {}
+        for cfg in all_configs:
+            should_be_enabled = cfg in selected_items
+            if should_be_enabled == current_states[cfg]:
+                continue
+            if should_be_enabled and statuses[cfg] == resymlink.STATUS_MISSING:
+                utils.info(f"Source directory not found for {cfg} in the Serein repository. Skipping.")
+                continue
+            if should_be_enabled and statuses[cfg] in (resymlink.STATUS_EXTERNAL, resymlink.STATUS_UNMANAGED):
+                target_path = os.path.join(resymlink.CONFIG_DIR, cfg)
+                if not utils.confirm_action(f"Warning: '{target_path}' already exists and is not a Serein symlink. Overwrite it?"):
+                    utils.info(f"Skipping {cfg}.")
+                    continue
+            desired[cfg] = should_be_enabled
+
+        # Apply all config and feature changes in one pass with a single round of reloads
+        features = {feature: feature in selected_items for feature in FEATURES}
+        apply_state(persistent_dir, desired, features, force=True)
 
         utils.info("Configuration changes applied successfully.")
 
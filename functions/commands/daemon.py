@@ -0,0 +1,257 @@
+import ctypes
+import ctypes.util
+import json
+import os
+import selectors
+import signal
+import socket
+import struct
+import sys
+import time
+
+import daemonclient
+import resymlink
+from . import hyprpm, utils
+from .journal import GenerationJournal
+
+# Optional user daemon behind 'serein daemon'. It keeps config, symlink, generation and
+# hyprpm plugin state in memory, updates it from inotify events on ~/.config, the
+# persistent dir and hyprpm's state dir, and answers JSON queries on a Unix socket (see
+# daemonclient.py). Queries only serialise the cached state; the filesystem is rescanned
+# when an event arrives, when inotify overflows, and every FULL_REFRESH_SECONDS.
+
+FULL_REFRESH_SECONDS = 300
+
+# --- inotify ---
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+DIR_CHANGES = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_ATTRIB | IN_DELETE_SELF | IN_MOVE_SELF
+FILE_CHANGES = DIR_CHANGES | IN_MODIFY | IN_CLOSE_WRITE
+
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class Inotify:
+    """Minimal inotify binding over ctypes. Watches map to a category name."""
+
+    def __init__(self):
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watches = {}  # wd -> category
+
+    def add_watch(self, path, mask, category):
+        """Watches path; returns False if it does not exist (yet)."""
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            return False
+        self.watches[wd] = category
+        return True
+
+    def read(self):
+        """Returns the categories touched by the pending events, with 'overflow' when events were lost."""
+        categories = set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return categories
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size + length
+            if mask & IN_Q_OVERFLOW:
+                categories.add("overflow")
+            elif mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+            elif wd in self.watches:
+                categories.add(self.watches[wd])
+        return categories
+
+    def close(self):
+        os.close(self.fd)
+
+# --- State ---
+
+class DaemonState:
+    def __init__(self, persistent_dir):
+        self.persistent_dir = persistent_dir
+        self.configs = {}
+        self.active = resymlink.CHECKOUT
+        self.generations = []
+        self.plugins = {}
+        self.updated_at = 0.0
+
+    def refresh_configs(self):
+        all_configs = resymlink.CONFIGS_MINIMAL + resymlink.CONFIGS_EXTRA
+        managed = set(resymlink.get_configs_to_manage(self.persistent_dir))
+        self.active = resymlink.get_active_target(self.persistent_dir)
+        self.configs = {
+            cfg: {"status": resymlink.config_status(self.persistent_dir, cfg), "managed": cfg in managed}
+            for cfg in sorted(all_configs)
+        }
+
+    def refresh_generations(self):
+        # A fresh journal object each time; the CLI's cached one belongs to its own process
+        try:
+            journal = GenerationJournal(utils.get_journal_path())
+        except (OSError, ValueError):
+            return
+        self.generations = [
+            {key: gen.get(key) for key in ("id", "date", "commit_hash", "description", "cold", "archive")}
+            for gen in journal.available()
+        ]
+
+    def refresh_plugins(self):
+        self.plugins = hyprpm.get_repositories(use_daemon=False) # Never ask ourselves
+
+    def refresh(self, categories):
+        if categories & {"configs", "persistent", "overflow", "all"}:
+            self.refresh_configs()
+        if categories & {"generations", "persistent", "overflow", "all"}:
+            self.refresh_generations()
+        if categories & {"plugins", "overflow", "all"}:
+            self.refresh_plugins()
+        self.updated_at = time.time()
+
+    def answer(self, name):
+        overview = any(plugins.get("hyprtasking") for plugins in self.plugins.values())
+        if name == "ping":
+            return {"pid": os.getpid(), "updated_at": self.updated_at}
+        if name == "configs":
+            return {"configs": self.configs, "active": self.active, "overview": overview}
+        if name == "generations":
+            return {"generations": self.generations}
+        if name == "plugins":
+            return {"plugins": self.plugins, "overview": overview}
+        if name == "status":
+            return {
+                "configs": self.configs, "active": self.active, "overview": overview,
+                "generations": self.generations, "plugins": self.plugins, "updated_at": self.updated_at,
+            }
+        raise KeyError(name)
+
+# --- Server ---
+
+def add_watches(inotify, persistent_dir):
+    """Watches everything the state is derived from. Missing directories are retried on refresh."""
+    inotify.add_watch(resymlink.CONFIG_DIR, DIR_CHANGES | IN_ONLYDIR, "configs")
+    # 'current' flips, .full_install and the journal live at the top of the persistent dir
+    inotify.add_watch(persistent_dir, FILE_CHANGES | IN_ONLYDIR, "persistent")
+    inotify.add_watch(os.path.join(persistent_dir, "config"), DIR_CHANGES | IN_ONLYDIR, "configs")
+    state_dir = hyprpm.get_hyprpm_state_dir()
+    if state_dir:
+        inotify.add_watch(state_dir, FILE_CHANGES | IN_ONLYDIR, "plugins")
+        with os.scandir(state_dir) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    inotify.add_watch(entry.path, FILE_CHANGES | IN_ONLYDIR, "plugins")
+
+def open_socket(path):
+    """Binds the query socket, replacing a stale one. Exits if another daemon is serving it."""
+    if daemonclient.query("ping", socket_path=path) is not None:
+        utils.error(f"A serein daemon is already running on {path}.")
+    if os.path.exists(path):
+        os.remove(path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask = os.umask(0o177) # Only the user may query
+    try:
+        server.bind(path)
+    finally:
+        os.umask(old_umask)
+    server.listen(16)
+    server.setblocking(False)
+    return server
+
+def handle_client(server, state):
+    try:
+        conn, _ = server.accept()
+    except BlockingIOError:
+        return
+    with conn:
+        conn.settimeout(1.0)
+        try:
+            request = b""
+            while not request.endswith(b"\n") and len(request) < 4096:
+                chunk = conn.recv(4096)
+                if not chunk:
+                    break
+                request += chunk
+            message = json.loads(request or b"{}")
+            if not isinstance(message, dict) or not isinstance(message.get("query", "status"), str):
+                raise ValueError('expected {"query": "<name>"}')
+            name = message.get("query", "status")
+            if name == "refresh":
+                state.refresh({"all"})
+                name = "ping"
+            reply = {"ok": True, "data": state.answer(name)}
+        except KeyError as e:
+            reply = {"ok": False, "error": f"unknown query {e}"}
+        except (OSError, ValueError) as e:
+            reply = {"ok": False, "error": str(e)}
+        try:
+            conn.sendall(json.dumps(reply, separators=(",", ":")).encode())
+        except OSError:
+            pass
+
+def daemon_command():
+    """Runs the state daemon in the foreground until SIGINT/SIGTERM."""
+    persistent_dir = utils.get_persistent_dir()
+    socket_path = daemonclient.get_socket_path()
+
+    state = DaemonState(persistent_dir)
+    inotify = Inotify()
+    add_watches(inotify, persistent_dir)
+    state.refresh({"all"})
+    server = open_socket(socket_path)
+
+    # SIGTERM (systemd stop) unwinds through the cleanup below like Ctrl+C does
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    selector = selectors.DefaultSelector()
+    selector.register(server, selectors.EVENT_READ, "socket")
+    selector.register(inotify.fd, selectors.EVENT_READ, "inotify")
+    utils.info(f"serein daemon listening on {socket_path}")
+
+    next_full_refresh = time.monotonic() + FULL_REFRESH_SECONDS
+    try:
+        while True:
+            timeout = max(0.0, next_full_refresh - time.monotonic())
+            for key, _ in selector.select(timeout):
+                if key.data == "socket":
+                    handle_client(server, state)
+                    continue
+                # Let a burst of events (e.g. a whole update) settle before rescanning
+                time.sleep(0.05)
+                categories = inotify.read()
+                if "overflow" in categories or "persistent" in categories:
+                    add_watches(inotify, persistent_dir) # Picks up directories created since
+                if categories:
+                    state.refresh(categories)
+            if time.monotonic() >= next_full_refresh:
+                add_watches(inotify, persistent_dir)
+                state.refresh({"all"})
+                next_full_refresh = time.monotonic() + FULL_REFRESH_SECONDS
+    finally:
+        selector.close()
+        server.close()
+        inotify.close()
+        try:
+            os.remove(socket_path)
+        except FileNotFoundError:
+            pass
+        utils.info("serein daemon stopped.")
@@ -0,0 +1,124 @@
+import json
+import os
+import re
+
+import daemonclient
+from . import utils
+
+# Parsed 'hyprpm list' output is cached and keyed by the mtimes of hyprpm's on-disk state.
+# hyprpm rewrites a state.toml whenever a repository is added or a plugin is toggled, so
+# as long as those mtimes are unchanged the cached table is current and a status query
+# costs a few stat calls instead of running hyprpm.
+
+# Bumped when the parser changes, so tables cached by an older parser are dropped
+CACHE_VERSION = 2
+
+# hyprpm colours its output (e.g. "\x1b[32m→\x1b[0m Repository ...")
+ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;]*m")
+
+def get_hyprpm_state_dir():
+    """Returns hyprpm's data state directory, or None if hyprpm has no state yet."""
+    candidates = []
+    if os.environ.get("XDG_DATA_HOME"):
+        candidates.append(os.path.join(os.environ["XDG_DATA_HOME"], "hyprpm"))
+    candidates.append(os.path.join(os.path.expanduser("~"), ".local", "share", "hyprpm"))
+    candidates.append(os.path.join("/var/cache/hyprpm", os.environ.get("USER", ""))) # Older hyprpm versions
+
+    for path in candidates:
+        if os.path.isdir(path):
+            return path
+    return None
+
+def get_cache_path():
+    return os.path.join(utils.get_state_dir(), "hyprpm.json")
+
+def state_signature(state_dir):
+    """Returns the mtimes of hyprpm's state directory and state files."""
+    signature = [os.stat(state_dir).st_mtime_ns]
+    with os.scandir(state_dir) as entries:
+        for entry in sorted(entries, key=lambda e: e.name):
+            state_file = os.path.join(entry.path, "state.toml") if entry.is_dir() else entry.path
+            try:
+                signature.append([entry.name, os.stat(state_file).st_mtime_ns])
+            except FileNotFoundError:
+                continue
+    return signature
+
+def parse_hyprpm_list(output):
+    """Parses 'hyprpm list' output into {repository: {plugin: enabled}}."""
+    repositories = {}
+    current_repo = None
+    current_plugin = None
+    for line in ANSI_ESCAPE.sub("", output).lower().splitlines():
+        # Strip the tree drawing characters hyprpm prints in front of every line
+        line = line.lstrip(" →│└─├").strip()
+        if line.startswith("repository "):
+            current_repo = line.split()[1].rstrip(":")
+            repositories[current_repo] = {}
+            current_plugin = None
+        elif line.startswith("plugin ") and current_repo is not None:
+            current_plugin = line.split()[1]
+            repositories[current_repo][current_plugin] = False
+        elif line.startswith("enabled:") and current_plugin is not None:
+            repositories[current_repo][current_plugin] = "true" in line
+    return repositories
+
+def _read_cache():
+    try:
+        with open(get_cache_path(), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _write_cache(signature, repositories):
+    path = get_cache_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "w") as f:
+        json.dump({"version": CACHE_VERSION, "signature": signature, "repositories": repositories}, f)
+    os.replace(tmp_path, path)
+
+def get_repositories(use_daemon=True):
+    """Returns {repository: {plugin: enabled}} for every hyprpm repository, from the daemon or the cache when current."""
+    if use_daemon:
+        # A running 'serein daemon' keeps the table current from inotify events
+        state = daemonclient.query("plugins")
+        if state is not None:
+            return state["plugins"]
+
+    state_dir = get_hyprpm_state_dir()
+    signature = state_signature(state_dir) if state_dir else None
+
+    if signature is not None:
+        cached = _read_cache()
+        if cached and cached.get("version") == CACHE_VERSION and cached.get("signature") == signature:
+            return cached["repositories"]
+
+    stdout, _, returncode = utils.run_command("hyprpm list", check_error=False)
+    if returncode != 0:
+        return {}
+
+    repositories = parse_hyprpm_list(stdout)
+    if signature is not None:
+        _write_cache(signature, repositories)
+    return repositories
+
+def get_plugins():
+    """Returns {plugin: enabled} across all repositories."""
+    plugins = {}
+    for repo_plugins in get_repositories().values():
+        plugins.update(repo_plugins)
+    return plugins
+
+def has_repository(name):
+    return name.lower() in get_repositories()
+
+def is_plugin_enabled(name):
+    return get_plugins().get(name.lower(), False)
+
+def invalidate():
+    """Drops the cached plugin table, e.g. after running hyprpm."""
+    try:
+        os.remove(get_cache_path())
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,220 @@
+import bisect
+import fcntl
+import json
+import os
+from contextlib import contextmanager
+
+# Compact once superseded records outnumber live generations by this factor.
+COMPACT_RATIO = 2
+
+
+class GenerationJournal:
+    """
+    Append-only, fsync'd log of generation records with an in-memory index.
+
+    Each line is one JSON record: {"op": "add", "gen": {...}} creates a generation and
+    {"op": "set", "id": N, "fields": {...}} updates one. Lines that are not valid records
+    are skipped. A torn trailing line left by a crash is ignored on load and truncated
+    away on the next append. Writers hold an flock on a sidecar .lock file (compaction
+    replaces the log itself) and first apply whatever other processes appended meanwhile.
+    """
+
+    def __init__(self, path, legacy_path=None):
+        self.path = path
+        self.legacy_path = legacy_path
+        self._reset()
+        self._load()
+
+    def _reset(self):
+        self._by_id = {}
+        self._available = {}  # Ordered by id, holds non-archived generations only.
+        self._by_commit = {}  # commit hash -> ids of its non-archived generations, ascending
+        self._indexed_commit = {}  # id -> the commit hash it is listed under in _by_commit
+        self._record_count = 0
+        self._valid_size = 0  # Offset just past the last complete line read
+        self._inode = None
+
+    # --- Loading ---
+
+    def _load(self):
+        if not os.path.exists(self.path) and self.legacy_path and os.path.exists(self.legacy_path):
+            with self._locked():
+                self._migrate_legacy()
+            return
+
+        try:
+            with open(self.path, "rb") as f:
+                self._inode = os.fstat(f.fileno()).st_ino
+                self._read_records(f)
+        except FileNotFoundError:
+            pass
+
+    def _read_records(self, f):
+        """Applies the complete lines from the current offset of f on; stops at a torn trailing line."""
+        for line in f:
+            if not line.endswith(b"\n"):
+                break  # Torn write, drop it.
+            self._valid_size += len(line)
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # A damaged line only loses its own record
+            self._apply(record)
+
+    def _migrate_legacy(self):
+        with open(self.legacy_path, "r") as f:
+            data = json.load(f)
+        if not isinstance(data.get("generations"), list):
+            raise ValueError(f"{self.legacy_path} is malformed")
+        for gen in data["generations"]:
+            self._apply({"op": "add", "gen": gen})
+        self._compact()
+        os.replace(self.legacy_path, f"{self.legacy_path}.migrated")
+
+    def _apply(self, record):
+        """Applies one record to the index. Records of the wrong shape are ignored."""
+        if not isinstance(record, dict):
+            return
+        if record.get("op") == "add":
+            gen = record.get("gen")
+            if not isinstance(gen, dict) or not isinstance(gen.get("id"), int):
+                return
+            gen = dict(gen)
+            self._by_id[gen["id"]] = gen
+        elif record.get("op") == "set":
+            gen = self._by_id.get(record.get("id"))
+            if gen is None or not isinstance(record.get("fields"), dict):
+                return
+            gen.update(record["fields"])
+        else:
+            return
+
+        self._record_count += 1
+        if gen.get("archived", False):
+            self._available.pop(gen["id"], None)
+        else:
+            self._available[gen["id"]] = None
+        self._index_commit(gen)
+
+    def _index_commit(self, gen):
+        gen_id = gen["id"]
+        commit_hash = gen.get("commit_hash") if not gen.get("archived", False) else None
+        previous = self._indexed_commit.get(gen_id)
+        if previous == commit_hash:
+            return
+        if previous is not None:
+            ids = self._by_commit[previous]
+            ids.remove(gen_id)
+            if not ids:
+                del self._by_commit[previous]
+            del self._indexed_commit[gen_id]
+        if commit_hash:
+            bisect.insort(self._by_commit.setdefault(commit_hash, []), gen_id)
+            self._indexed_commit[gen_id] = commit_hash
+
+    # --- Writing ---
+
+    @contextmanager
+    def _locked(self):
+        """Holds the journal's write lock and brings the index up to date with the log on disk."""
+        with open(f"{self.path}.lock", "ab") as lock:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            try:
+                st = os.stat(self.path)
+            except FileNotFoundError:
+                st = None
+            if st is not None and (st.st_ino != self._inode or st.st_size < self._valid_size):
+                # Compacted (replaced) by another process: read it again from the start
+                self._reset()
+                self._load()
+            elif st is not None and st.st_size > self._valid_size:
+                with open(self.path, "rb") as f:
+                    f.seek(self._valid_size)
+                    self._read_records(f)
+            yield
+
+    def _append(self, record):
+        line = (json.dumps(record, separators=(",", ":")) + "\n").encode()
+        with self._locked():
+            if record["op"] == "add" and record["gen"]["id"] in self._by_id:
+                raise ValueError(f"generation {record['gen']['id']} already exists")
+            with open(self.path, "ab") as f:
+                if f.tell() != self._valid_size:
+                    # Only a torn trailing line is left past the last complete record
+                    f.truncate(self._valid_size)
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+                self._inode = os.fstat(f.fileno()).st_ino
+            self._valid_size += len(line)
+            self._apply(record)
+
+            if self._record_count > COMPACT_RATIO * max(len(self._by_id), 1):
+                self._compact()
+
+    def add(self, gen):
+        """Appends a new generation. Raises ValueError if another process already added its id."""
+        self._append({"op": "add", "gen": gen})
+
+    def update(self, gen_id, **fields):
+        """Updates fields of an existing generation."""
+        if gen_id not in self._by_id:
+            raise KeyError(gen_id)
+        self._append({"op": "set", "id": gen_id, "fields": fields})
+
+    def compact(self):
+        """Atomically rewrites the journal with one record per generation."""
+        with self._locked():
+            self._compact()
+
+    def _compact(self):
+        tmp_path = f"{self.path}.tmp-{os.getpid()}"
+        size = 0
+        with open(tmp_path, "wb") as f:
+            for gen in self._by_id.values():
+                line = (json.dumps({"op": "add", "gen": gen}, separators=(",", ":")) + "\n").encode()
+                f.write(line)
+                size += len(line)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+        dir_fd = os.open(os.path.dirname(self.path) or ".", os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+        self._record_count = len(self._by_id)
+        self._valid_size = size
+        self._inode = os.stat(self.path).st_ino
+
+    # --- Queries ---
+
+    def get(self, gen_id):
+        """Returns the generation with the given id, or None."""
+        return self._by_id.get(gen_id)
+
+    def all(self):
+        """Returns every generation, archived included, oldest first."""
+        return list(self._by_id.values())
+
+    def available(self):
+        """Returns the non-archived generations, oldest first."""
+        return [self._by_id[gen_id] for gen_id in self._available]
+
+    def latest(self):
+        """Returns the newest non-archived generation, or None."""
+        if not self._available:
+            return None
+        return self._by_id[next(reversed(self._available))]
+
+    def last_id(self):
+        """Returns the highest generation id ever used, archived included."""
+        if not self._by_id:
+            return 0
+        return next(reversed(self._by_id))
+
+    def by_commit(self, commit_hash):
+        """Returns the newest non-archived generation recorded for a commit, or None."""
+        ids = self._by_commit.get(commit_hash)
+        return self._by_id[ids[-1]] if ids else None
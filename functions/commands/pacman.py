@@ -0,0 +1,246 @@
+import glob
+import json
+import os
+import tarfile
+
+from . import utils
+
+# Read-only index over pacman's databases, used to drop no-op package operations before
+# calling paru. Local entries live in /var/lib/pacman/local/<name>-<pkgver>-<pkgrel>/desc;
+# adding or removing a package adds or removes such a directory, which updates the mtime
+# of the db directory, so the parsed index is cached and keyed by that mtime.
+
+LOCAL_DB_DIR = "/var/lib/pacman/local"
+SYNC_DB_DIR = "/var/lib/pacman/sync"
+PACMAN_CONF = "/etc/pacman.conf"
+
+# --- Parsing ---
+
+def parse_desc(text):
+    """Parses a pacman desc file into {"%FIELD%": [values]}."""
+    fields = {}
+    current = None
+    for line in text.splitlines():
+        if line.startswith("%") and line.endswith("%"):
+            current = fields.setdefault(line, [])
+        elif line and current is not None:
+            current.append(line)
+    return fields
+
+def split_entry_name(entry):
+    """Splits a '<name>-<pkgver>-<pkgrel>' db entry into (name, version)."""
+    name, version, release = entry.rsplit("-", 2)
+    return name, f"{version}-{release}"
+
+def read_repo_order(conf_path=PACMAN_CONF, _depth=0):
+    """Returns the repository names in the order pacman.conf (and the files it includes) lists them."""
+    repos = []
+    try:
+        with open(conf_path, "r") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return repos
+    for line in lines:
+        line = line.split("#", 1)[0].strip()
+        if line.startswith("[") and line.endswith("]"):
+            name = line[1:-1].strip()
+            if name != "options" and name not in repos:
+                repos.append(name)
+        elif line.startswith("Include") and "=" in line and _depth < 5:
+            # Usually a mirrorlist, but an included file may declare repositories of its own
+            for path in sorted(glob.glob(line.split("=", 1)[1].strip())):
+                repos += [name for name in read_repo_order(path, _depth + 1) if name not in repos]
+    return repos
+
+def _strip_constraint(dep):
+    for operator in (">=", "<=", "=", ">", "<"):
+        dep = dep.split(operator, 1)[0]
+    return dep
+
+# --- Local database ---
+
+def _cache_path(name):
+    return os.path.join(utils.get_state_dir(), name)
+
+def _read_cache(name, key):
+    try:
+        with open(_cache_path(name), "r") as f:
+            cached = json.load(f)
+        if cached.get("key") == key:
+            return cached["index"]
+    except (OSError, ValueError, KeyError):
+        pass
+    return None
+
+def _write_cache(name, key, index):
+    path = _cache_path(name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "w") as f:
+        json.dump({"key": key, "index": index}, f)
+    os.replace(tmp_path, path)
+
+def build_local_index(db_dir=LOCAL_DB_DIR):
+    """Reads the local db into {"packages": {name: version}, "provides": {provision: name}}."""
+    packages = {}
+    provides = {}
+    with os.scandir(db_dir) as entries:
+        for entry in entries:
+            if not entry.is_dir():
+                continue
+            try:
+                name, version = split_entry_name(entry.name)
+            except ValueError:
+                continue
+            packages[name] = version
+            try:
+                with open(os.path.join(entry.path, "desc"), "r") as f:
+                    fields = parse_desc(f.read())
+            except OSError:
+                continue
+            for provision in fields.get("%PROVIDES%", []):
+                provides.setdefault(_strip_constraint(provision), name)
+    return {"packages": packages, "provides": provides}
+
+def get_local_index(db_dir=LOCAL_DB_DIR):
+    """Returns the local package index, rebuilt only when the db directory changed."""
+    try:
+        key = [db_dir, os.stat(db_dir).st_mtime_ns]
+    except FileNotFoundError:
+        return {"packages": {}, "provides": {}}
+
+    index = _read_cache("pacman-local.json", key)
+    if index is None:
+        index = build_local_index(db_dir)
+        _write_cache("pacman-local.json", key, index)
+    return index
+
+def get_sync_versions(sync_dir=SYNC_DB_DIR, conf_path=PACMAN_CONF):
+    """Returns {name: version} from the sync databases, first repository in pacman.conf wins. Cached by db mtimes."""
+    try:
+        db_names = sorted(entry.name[:-3] for entry in os.scandir(sync_dir) if entry.name.endswith(".db"))
+    except FileNotFoundError:
+        return {}
+    # Same precedence as pacman; dbs of repositories no longer configured go last
+    order = {name: i for i, name in enumerate(read_repo_order(conf_path))}
+    db_names.sort(key=lambda name: order.get(name, len(order)))
+    db_files = [os.path.join(sync_dir, f"{name}.db") for name in db_names]
+    key = [[path, os.stat(path).st_mtime_ns] for path in db_files]
+
+    versions = _read_cache("pacman-sync.json", key)
+    if versions is None:
+        versions = {}
+        for path in db_files:
+            try:
+                # Entry names carry name and version, so the desc files never need to be read
+                with tarfile.open(path) as db:
+                    entries = {member.name.lstrip("./").split("/", 1)[0] for member in db}
+                for entry in sorted(entries):
+                    try:
+                        name, version = split_entry_name(entry)
+                    except ValueError:
+                        continue
+                    versions.setdefault(name, version)
+            except (tarfile.TarError, OSError):
+                continue # e.g. a zstd compressed db
+        _write_cache("pacman-sync.json", key, versions)
+    return versions
+
+# --- Queries ---
+
+def is_installed(package, index):
+    return package in index["packages"] or package in index["provides"]
+
+def filter_install(packages, db_dir=LOCAL_DB_DIR):
+    """Splits packages into (to_install, already_installed)."""
+    index = get_local_index(db_dir)
+    to_install = [pkg for pkg in packages if not is_installed(pkg, index)]
+    installed = [pkg for pkg in packages if is_installed(pkg, index)]
+    return to_install, installed
+
+def filter_remove(packages, db_dir=LOCAL_DB_DIR):
+    """Splits packages into (to_remove, not_installed). Removal needs the real package name."""
+    index = get_local_index(db_dir)
+    to_remove = [pkg for pkg in packages if pkg in index["packages"]]
+    missing = [pkg for pkg in packages if pkg not in index["packages"]]
+    return to_remove, missing
+
+def _split_version(version):
+    epoch = "0"
+    if ":" in version:
+        epoch, version = version.split(":", 1)
+    release = None
+    if "-" in version:
+        version, release = version.rsplit("-", 1)
+    return epoch, version, release
+
+def _rpmvercmp(a, b):
+    # Port of libalpm's rpmvercmp: compares alternating numeric and alphabetic segments
+    if a == b:
+        return 0
+    i = j = 0         # Current positions
+    end_a = end_b = 0 # Ends of the previous segments
+    while i < len(a) and j < len(b):
+        while i < len(a) and not a[i].isalnum():
+            i += 1
+        while j < len(b) and not b[j].isalnum():
+            j += 1
+        if i >= len(a) or j >= len(b):
+            break
+        # Different separator lengths decide the comparison
+        if i - end_a != j - end_b:
+            return -1 if i - end_a < j - end_b else 1
+
+        end_a, end_b = i, j
+        numeric = a[i].isdigit()
+        is_segment_char = str.isdigit if numeric else str.isalpha
+        while end_a < len(a) and is_segment_char(a[end_a]):
+            end_a += 1
+        while end_b < len(b) and is_segment_char(b[end_b]):
+            end_b += 1
+
+        seg_a, seg_b = a[i:end_a], b[j:end_b]
+        if not seg_b:
+            # Numeric segments are always newer than alphabetic ones
+            return 1 if numeric else -1
+        if numeric:
+            seg_a, seg_b = seg_a.lstrip("0"), seg_b.lstrip("0")
+            if len(seg_a) != len(seg_b):
+                return 1 if len(seg_a) > len(seg_b) else -1
+        if seg_a != seg_b:
+            return 1 if seg_a > seg_b else -1
+        i, j = end_a, end_b
+
+    if i >= len(a) and j >= len(b):
+        return 0
+    # A trailing alphabetic segment (e.g. 1.0a vs 1.0) marks a pre-release
+    if (i >= len(a) and not b[j].isalpha()) or (i < len(a) and a[i].isalpha()):
+        return -1
+    return 1
+
+def vercmp(a, b):
+    """Compares two pacman versions like vercmp(8). Returns -1, 0 or 1."""
+    epoch_a, version_a, release_a = _split_version(a)
+    epoch_b, version_b, release_b = _split_version(b)
+    result = _rpmvercmp(epoch_a, epoch_b) or _rpmvercmp(version_a, version_b)
+    if result == 0 and release_a and release_b:
+        result = _rpmvercmp(release_a, release_b)
+    return result
+
+def package_status(packages, db_dir=LOCAL_DB_DIR, sync_dir=SYNC_DB_DIR):
+    """Returns {package: (status, local_version, sync_version)} with status installed, missing or outdated."""
+    index = get_local_index(db_dir)
+    sync_versions = get_sync_versions(sync_dir)
+    statuses = {}
+    for pkg in packages:
+        name = pkg if pkg in index["packages"] else index["provides"].get(pkg)
+        if name is None:
+            statuses[pkg] = ("missing", None, sync_versions.get(pkg))
+            continue
+        local_version = index["packages"][name]
+        sync_version = sync_versions.get(name)
+        if sync_version and vercmp(local_version, sync_version) < 0:
+            statuses[pkg] = ("outdated", local_version, sync_version)
+        else:
+            statuses[pkg] = ("installed", local_version, sync_version)
+    return statuses
@@ -1,11 +1,52 @@
+import os
+
 import typer
 from typing_extensions import Annotated
-from InquirerPy import inquirer
-from InquirerPy.base.control import Choice
-from .utils import paru_update, paru_install, paru_remove, info
+from . import pacman
+from .utils import ask, paru_update, paru_install, paru_remove, info, get_source_dir
 
 pkg_app = typer.Typer(help="Manage system packages using paru.")
 
+STATUS_COLORS = {
+    "installed": typer.colors.GREEN,
+    "outdated": typer.colors.YELLOW,
+    "missing": typer.colors.RED,
+}
+
+def install_packages(packages):
+    """Installs packages with paru, skipping the ones that are already installed."""
+    to_install, installed = pacman.filter_install(packages)
+    if installed:
+        info(f"Already installed, skipping: {', '.join(installed)}")
+    if not to_install:
+        info("Nothing to install.")
+        return
+    info(f"Installing packages: {', '.join(to_install)}")
+    paru_install(to_install)
+
+def remove_packages(packages):
+    """Removes packages with paru, skipping the ones that are not installed."""
+    to_remove, missing = pacman.filter_remove(packages)
+    if missing:
+        info(f"Not installed, skipping: {', '.join(missing)}")
+    if not to_remove:
+        info("Nothing to remove.")
+        return
+    info(f"Removing packages: {', '.join(to_remove)}")
+    paru_remove(to_remove)
+
+def read_package_sets():
+    """Returns {"minimal": [...], "full": [...]} from the package lists shipped with Serein."""
+    assets_dir = os.path.join(get_source_dir(), "assets")
+    package_sets = {}
+    for name in ("minimal", "full"):
+        try:
+            with open(os.path.join(assets_dir, f"packages.{name}"), "r") as f:
+                package_sets[name] = f.read().split()
+        except FileNotFoundError:
+            package_sets[name] = []
+    return package_sets
+
 @pkg_app.callback(invoke_without_command=True)
 def pkg_main(ctx: typer.Context):
     if ctx.invoked_subcommand is None:
@@ -23,32 +64,52 @@ def pkg_install(
     packages: list[str] = typer.Argument(None, help="Packages to install.")
 ):
     if not packages:
-        packages = inquirer.text(message="Enter packages to install:").execute().split()
-    info(f"Installing packages: {', '.join(packages)}")
-    paru_install(packages)
+        from InquirerPy import inquirer
+        packages = ask(inquirer.text(message="Enter packages to install:")).split()
+    install_packages(packages)
 
 @pkg_app.command("remove", help="Remove packages using paru.")
 def pkg_remove(
     packages: list[str] = typer.Argument(None, help="Packages to remove.")
 ):
     if not packages:
-        packages = inquirer.text(message="Enter packages to remove:").execute().split()
-    info(f"Removing packages: {', '.join(packages)}")
-    paru_remove(packages)
-
-from InquirerPy.utils import get_style
+        from InquirerPy import inquirer
+        packages = ask(inquirer.text(message="Enter packages to remove:")).split()
+    remove_packages(packages)
 
-custom_style = get_style({
-    "questionmark": "#86afef",
-    "question": "",
-    "input": "#86afef",
-    "answer": "#86afef",
-    "pointer": "#86afef",
-    "selection": "#86afef",
-}, style_override=False)
+@pkg_app.command("status", help="Show installed, missing and outdated packages of the Serein package sets.")
+def pkg_status():
+    for set_name, packages in read_package_sets().items():
+        statuses = pacman.package_status(packages)
+        counts = {status: 0 for status in STATUS_COLORS}
+        typer.echo(f"{set_name}:")
+        for pkg, (status, local_version, sync_version) in statuses.items():
+            counts[status] += 1
+            if status == "outdated":
+                detail = f" ({local_version} -> {sync_version})"
+            elif status == "installed":
+                detail = f" ({local_version})"
+            else:
+                detail = ""
+            typer.echo(f"- {pkg}: {typer.style(status, fg=STATUS_COLORS[status])}{detail}")
+        info(f"{set_name}: {counts['installed']} installed, {counts['outdated']} outdated, {counts['missing']} missing")
 
 def interactive_mode():
-    action = inquirer.select(
+    # InquirerPy (and prompt_toolkit) are only needed once we actually prompt
+    from InquirerPy import inquirer
+    from InquirerPy.base.control import Choice
+    from InquirerPy.utils import get_style
+
+    custom_style = get_style({
+        "questionmark": "#86afef",
+        "question": "",
+        "input": "#86afef",
+        "answer": "#86afef",
+        "pointer": "#86afef",
+        "selection": "#86afef",
+    }, style_override=False)
+
+    action = ask(inquirer.select(
         message="What would you like to do?",
         style=custom_style,
         choices=[
@@ -58,18 +119,16 @@ def interactive_mode():
             Choice(value=None, name="Exit"),
         ],
         default=None,
-    ).execute()
+    ))
 
     if action == "update":
         info("Updating system packages...")
         paru_update()
     elif action == "install":
-        packages = inquirer.text(message="Enter packages to install:", style=custom_style).execute()
+        packages = ask(inquirer.text(message="Enter packages to install:", style=custom_style))
         if packages:
-            info(f"Installing packages: {', '.join(packages.split())}")
-            paru_install(packages.split())
+            install_packages(packages.split())
     elif action == "remove":
-        packages = inquirer.text(message="Enter packages to remove:", style=custom_style).execute()
+        packages = ask(inquirer.text(message="Enter packages to remove:", style=custom_style))
         if packages:
-            info(f"Removing packages: {', '.join(packages.split())}")
-            paru_remove(packages.split())
+            remove_packages(packages.split())
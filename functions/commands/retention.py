@@ -0,0 +1,232 @@
+import os
+import shutil
+import stat
+import subprocess
+import tarfile
+import time
+from datetime import datetime
+
+import tracing
+from . import store, utils
+
+# Retention policy for generation backups. The newest KEEP_LAST generations, the newest
+# generation of each of the last KEEP_DAILY days and of each of the last KEEP_WEEKLY weeks
+# stay "hot" (hard-linked from the object store). Everything else, and the oldest kept
+# generations while the backups exceed MAX_STORE_BYTES, is compacted into a compressed
+# cold archive under generations/archive and marked "cold" in the journal. An archive
+# holds only the generation's config/, the part a rollback restores. MAX_STORE_BYTES caps
+# the object store and the archives together; past it the oldest archives are deleted and
+# their generations are restored from git instead. Planning and archiving stop after
+# TIME_BUDGET_SECONDS and continue on the next update.
+
+KEEP_LAST = 5
+KEEP_DAILY = 7
+KEEP_WEEKLY = 4
+MAX_STORE_BYTES = 512 * 1024 * 1024
+TIME_BUDGET_SECONDS = 10.0
+
+ZSTD_LEVEL = "-6"
+
+# The subtrees of a generation that go into its cold archive
+ARCHIVED_SUBTREES = ("config",)
+
+def get_archive_dir():
+    return os.path.join(store.get_generations_dir(), "archive")
+
+def get_archive_path(gen):
+    """Returns the cold archive of a generation, or None if it has none."""
+    if not gen.get("archive"):
+        return None
+    return os.path.join(get_archive_dir(), gen["archive"])
+
+# --- Policy ---
+
+def _newest_per_period(gens, period, count):
+    kept = {}
+    for gen in sorted(gens, key=lambda g: g["id"], reverse=True):
+        key = period(datetime.strptime(gen["date"], "%Y-%m-%d %H:%M:%S"))
+        if key not in kept:
+            if len(kept) == count:
+                break
+            kept[key] = gen["id"]
+    return set(kept.values())
+
+def select_kept(gens):
+    """Returns the ids of the generations the count and calendar rules keep hot."""
+    newest = sorted(gens, key=lambda g: g["id"], reverse=True)
+    kept = {gen["id"] for gen in newest[:KEEP_LAST]}
+    kept |= _newest_per_period(gens, lambda d: d.date(), KEEP_DAILY)
+    kept |= _newest_per_period(gens, lambda d: d.isocalendar()[:2], KEEP_WEEKLY)
+    return kept
+
+def _iter_files(top, deadline=None):
+    """Yields (path, lstat) for the files below top, stopping early once the deadline has passed."""
+    for root, _, files in os.walk(top):
+        if deadline is not None and time.monotonic() > deadline:
+            return
+        for name in files:
+            path = os.path.join(root, name)
+            yield path, os.lstat(path)
+
+def store_size(deadline=None):
+    """Returns the bytes held by the object store (a lower bound if the deadline cuts the walk short)."""
+    return sum(st.st_size for _, st in _iter_files(store.get_objects_dir(), deadline))
+
+def archives_size():
+    """Returns the bytes held by cold archives."""
+    try:
+        with os.scandir(get_archive_dir()) as entries:
+            return sum(entry.stat().st_size for entry in entries if entry.is_file())
+    except FileNotFoundError:
+        return 0
+
+def exclusive_size(gen_dir, deadline=None):
+    """Returns the bytes that removing a generation would free (objects only it links to)."""
+    links = {}  # inode -> [links inside gen_dir, st_nlink, size]
+    for _, st in _iter_files(gen_dir, deadline):
+        if stat.S_ISREG(st.st_mode):
+            links.setdefault(st.st_ino, [0, st.st_nlink, st.st_size])[0] += 1
+    # Freed when nothing but the store's own entry is left, however often this generation
+    # links the object; a link from any other tree (another generation, a slot) keeps it
+    return sum(size for count, nlink, size in links.values() if nlink - count <= 1)
+
+def plan_retention(gens, store_bytes, deadline=None):
+    """Returns the hot generations to archive, oldest first."""
+    hot = [gen for gen in gens if not gen.get("cold") and os.path.isdir(store.get_generation_dir(gen["id"]))]
+    kept = select_kept(hot)
+    to_archive = [gen for gen in hot if gen["id"] not in kept]
+
+    # Over budget: also archive the oldest kept generations, but never the newest one
+    size = store_bytes + archives_size()
+    for gen in to_archive:
+        size -= exclusive_size(store.get_generation_dir(gen["id"]), deadline)
+    newest_id = max((gen["id"] for gen in hot), default=None)
+    for gen in sorted((gen for gen in hot if gen["id"] in kept), key=lambda g: g["id"]):
+        if size <= MAX_STORE_BYTES or gen["id"] == newest_id:
+            break
+        if deadline is not None and time.monotonic() > deadline:
+            break # The walks are cut short now; the next update finishes the plan
+        size -= exclusive_size(store.get_generation_dir(gen["id"]), deadline)
+        to_archive.append(gen)
+    return sorted(to_archive, key=lambda g: g["id"])
+
+# --- Archives ---
+
+def _add_tree(archive, source_dir, subtree):
+    # Generation files are hard links into the store, which tarfile would record as links
+    # to earlier members; every file is stored in full so any subtree can be extracted alone
+    for root, dirs, files in os.walk(os.path.join(source_dir, subtree)):
+        dirs.sort()
+        for name in dirs + sorted(files):
+            path = os.path.join(root, name)
+            info = archive.gettarinfo(path, os.path.relpath(path, source_dir))
+            if info.islnk():
+                info.type = tarfile.REGTYPE
+                info.linkname = ""
+                info.size = os.lstat(path).st_size
+            if info.isreg():
+                with open(path, "rb") as f:
+                    archive.addfile(info, f)
+            else:
+                archive.addfile(info)
+
+def _add_subtrees(archive, source_dir):
+    for subtree in ARCHIVED_SUBTREES:
+        _add_tree(archive, source_dir, subtree)
+
+def write_archive(source_dir, dest_base):
+    """Writes the ARCHIVED_SUBTREES of source_dir as dest_base.tar.zst, or .tar.xz without zstd. Returns the archive path."""
+    if shutil.which("zstd"):
+        dest_path = f"{dest_base}.tar.zst"
+        tmp_path = f"{dest_path}.tmp-{os.getpid()}"
+        process = subprocess.Popen(["zstd", "-q", ZSTD_LEVEL, "-T0", "-f", "-o", tmp_path], stdin=subprocess.PIPE)
+        try:
+            with tarfile.open(fileobj=process.stdin, mode="w|") as archive:
+                _add_subtrees(archive, source_dir)
+        finally:
+            process.stdin.close()
+        if process.wait() != 0:
+            os.remove(tmp_path)
+            raise OSError(f"zstd failed with exit code {process.returncode}")
+    else:
+        dest_path = f"{dest_base}.tar.xz"
+        tmp_path = f"{dest_path}.tmp-{os.getpid()}"
+        with tarfile.open(tmp_path, mode="w|xz") as archive:
+            _add_subtrees(archive, source_dir)
+    os.replace(tmp_path, dest_path)
+    return dest_path
+
+# Refuses absolute paths, links out of the destination and special files where tarfile
+# supports extraction filters (3.12+, backported to security releases of older versions)
+EXTRACT_FILTER = {"filter": "data"} if hasattr(tarfile, "data_filter") else {}
+
+def extract_archive(archive_path, dest_dir, prefix=""):
+    """Extracts the members of a cold archive below prefix (e.g. 'config/') into dest_dir."""
+    def members(archive):
+        for member in archive:
+            if member.name.startswith(prefix):
+                yield member
+
+    if archive_path.endswith(".zst"):
+        process = subprocess.Popen(["zstd", "-q", "-d", "-c", archive_path], stdout=subprocess.PIPE)
+        try:
+            with tarfile.open(fileobj=process.stdout, mode="r|") as archive:
+                archive.extractall(dest_dir, members=members(archive), **EXTRACT_FILTER)
+        finally:
+            process.stdout.close()
+            if process.wait() != 0:
+                raise OSError(f"zstd failed to decompress {archive_path}")
+    else:
+        with tarfile.open(archive_path, mode="r|xz") as archive:
+            archive.extractall(dest_dir, members=members(archive), **EXTRACT_FILTER)
+
+# --- Engine ---
+
+def archive_generation(journal, gen):
+    """Moves a hot generation into a cold archive and marks it cold in the journal."""
+    gen_dir = store.get_generation_dir(gen["id"])
+    os.makedirs(get_archive_dir(), exist_ok=True)
+    with tracing.span("archive", "fs", path=gen_dir):
+        archive_path = write_archive(gen_dir, os.path.join(get_archive_dir(), str(gen["id"])))
+    journal.update(gen["id"], cold=True, archive=os.path.basename(archive_path))
+    utils.remove_tree(gen_dir)
+
+def prune_archives(journal, store_bytes):
+    """Deletes the oldest cold archives while the store and the archives exceed MAX_STORE_BYTES. Returns the count."""
+    archived = sorted((gen for gen in journal.all() if get_archive_path(gen)), key=lambda g: g["id"])
+    size = store_bytes + archives_size()
+    pruned = 0
+    for gen in archived:
+        if size <= MAX_STORE_BYTES:
+            break
+        archive_path = get_archive_path(gen)
+        try:
+            size -= os.path.getsize(archive_path)
+            os.remove(archive_path)
+        except FileNotFoundError:
+            pass
+        # Still cold; a rollback to it extracts its configs from git instead
+        journal.update(gen["id"], archive=None)
+        pruned += 1
+    return pruned
+
+def apply_policy(journal, time_budget=TIME_BUDGET_SECONDS):
+    """Archives the generations the policy ages out, within a time budget. Returns (archived, remaining)."""
+    deadline = time.monotonic() + time_budget
+    store_bytes = store_size(deadline)
+    to_archive = plan_retention(journal.available(), store_bytes, deadline)
+    archived = 0
+    for gen in to_archive:
+        if time.monotonic() > deadline:
+            break
+        utils.info(f"Archiving generation {gen['id']} ({gen['date']})...")
+        archive_generation(journal, gen)
+        archived += 1
+    if archived:
+        freed = store.gc_objects()
+        store_bytes -= freed
+        utils.info(f"Archived {archived} generation(s), freeing {freed} bytes of backup data.")
+    pruned = prune_archives(journal, store_bytes)
+    if pruned:
+        utils.info(f"Removed the {pruned} oldest cold archive(s) to stay within {MAX_STORE_BYTES // (1024 * 1024)} MiB; they will be restored from git.")
+    return archived, len(to_archive) - archived
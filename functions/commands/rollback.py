@@ -1,5 +1,4 @@
 import os
-import shutil
 import sys
 from typing import Annotated
 
@@ -7,8 +6,8 @@ import typer
 from InquirerPy import inquirer
 from InquirerPy.utils import get_style
 
-import resymlink
-from . import utils
+import tracing
+from . import retention, slots, store, utils
 
 def rollback_command(
     no_confirm: Annotated[bool, typer.Option("--no-confirm", "-y", help="Skip confirmation prompts.")] = False,
@@ -18,17 +17,16 @@ def rollback_command(
         utils.error("Serein is not installed persistently. Cannot rollback.")
         
     persistent_dir = utils.get_persistent_dir()
-    generations = utils.read_generations()
-    
-    # Filter out archived generations for the user to choose from
-    available_generations = [gen for gen in generations if not gen.get("archived", False)]
+
+    # Only non-archived generations are offered to the user
+    available_generations = utils.list_generations()
 
     if not available_generations:
         utils.info("No generations found to rollback or remove.")
         return
 
     try:
-        action = inquirer.select(
+        action = utils.ask(inquirer.select(
             message="Choose an action:",
             choices=[
                 {"name": "Rollback to a generation", "value": "rollback"},
@@ -36,25 +34,28 @@ def rollback_command(
             ],
             default="rollback",
             style=get_style({"pointer": "#86afef bold", "question": "#86afef bold"}),
-        ).execute()
+        ))
 
         if action == "rollback":
             choice_to_generation = { 
-                f'{gen["id"]}: {gen["date"]} - {gen["description"]}': gen 
+                generation_label(gen): gen 
                 for gen in reversed(available_generations) 
             }
 
-            selected_choice = inquirer.select(
+            selected_choice = utils.ask(inquirer.select(
                 message="Select a generation to rollback to:",
                 choices=list(choice_to_generation.keys()),
                 style=get_style({"pointer": "#86afef bold", "question": "#86afef bold"}),
-            ).execute()
+            ))
             
             if selected_choice is None: # User escaped
                 utils.info("Rollback cancelled.")
                 return
 
-            selected_generation = choice_to_generation[selected_choice]
+            # The listing may come from the daemon; act on the journal's current record
+            selected_generation = utils.get_journal().get(choice_to_generation[selected_choice]["id"])
+            if selected_generation is None or selected_generation.get("archived"):
+                utils.error("The selected generation no longer exists.")
             commit_hash = selected_generation["commit_hash"]
 
             if not no_confirm and not utils.confirm_action(f'Are you sure you want to roll back to generation {selected_generation["id"]}'):
@@ -63,43 +64,30 @@ def rollback_command(
 
             utils.info(f'Rolling back to generation {selected_generation["id"]} (commit {commit_hash})...')
 
-            # Unsymlink configs
-            utils.info("Unsymlinking existing configurations...")
-            resymlink.unsymlink_configs(persistent_dir)
-
-            # Restore git state by resetting the branch to the specific commit
-            utils.info(f"Resetting Serein to commit {commit_hash}...")
-            original_cwd = os.getcwd()
-            os.chdir(persistent_dir)
-
-            _, _, _ = utils.run_command(f"git reset --hard {commit_hash}", error_message="git reset failed.")
-            _, _, _ = utils.run_command("git clean -fd", error_message="git clean failed.")
-
-            os.chdir(original_cwd)
+            # Build the generation in the inactive slot, then switch to it with one atomic flip.
+            # The live checkout is left alone, so 'serein update' returns to it.
+            slot = slots.inactive_slot()
+            slots.prepare_slot(slot, selected_generation)
+            slots.activate_slot(slot)
 
-            # Resymlink configs
-            utils.info("Symlinking new configurations...")
-            resymlink.symlink_configs(persistent_dir)
-
-            utils.info("Rollback complete.")
-            utils.clear_pycache()
+            utils.info(f"Rollback complete. Configurations are now served from slot {slot}.")
 
         elif action == "delete":
             choices = [
                 {
-                    "name": f'{gen["id"]}: {gen["date"]} - {gen["description"]}',
+                    "name": generation_label(gen),
                     "value": gen["id"],
                     "enabled": False,
                 }
                 for gen in reversed(available_generations)
             ]
 
-            selected_ids_to_remove = inquirer.checkbox(
+            selected_ids_to_remove = utils.ask(inquirer.checkbox(
                 message="Select generations to remove (Space to toggle, Enter to confirm):",
                 choices=choices,
                 cycle=False,
                 style=get_style({"pointer": "#86afef bold", "question": "#86afef bold"}),
-            ).execute()
+            ))
 
             if not selected_ids_to_remove:
                 utils.info("No generations selected. Removal cancelled.")
@@ -111,26 +99,32 @@ def rollback_command(
                 utils.info("Removal cancelled.")
                 return
 
+            journal = utils.get_journal()
             for gen_id_to_remove in selected_ids_to_remove:
-                # Find the generation in the original list and mark it as archived
-                for gen in generations:
-                    if gen["id"] == gen_id_to_remove:
-                        gen["archived"] = True
-                        break
-
+                journal.update(gen_id_to_remove, archived=True)
                 utils.info(f"Generation {gen_id_to_remove} has been archived and will no longer appear in the list.")
 
                 if not keep_backup:
-                    backup_dir_to_remove = os.path.join(
-                        utils.get_persistent_dir(), "generations", str(gen_id_to_remove)
-                    )
+                    backup_dir_to_remove = store.get_generation_dir(gen_id_to_remove)
                     if os.path.isdir(backup_dir_to_remove):
-                        shutil.rmtree(backup_dir_to_remove)
+                        utils.remove_tree(backup_dir_to_remove)
                         utils.info(f"Removed backup directory for generation {gen_id_to_remove}.")
-            
-            utils.write_generations(generations)
+                    archive_path = retention.get_archive_path(journal.get(gen_id_to_remove))
+                    if archive_path and os.path.isfile(archive_path):
+                        os.remove(archive_path)
+                        utils.info(f"Removed cold archive for generation {gen_id_to_remove}.")
+
+            if not keep_backup:
+                with tracing.span("gc_objects", "fs"):
+                    freed = store.gc_objects()
+                utils.info(f"Freed {freed} bytes of unreferenced backup data.")
             utils.info("Selected generations have been removed.")
 
     except KeyboardInterrupt:
         utils.info("Operation cancelled by user.")
         sys.exit(0)
+
+def generation_label(gen):
+    """Returns the menu label of a generation; cold ones are restored from their archive."""
+    label = f'{gen["id"]}: {gen["date"]} - {gen["description"]}'
+    return f"{label} (cold)" if gen.get("cold") else label
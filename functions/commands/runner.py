@@ -0,0 +1,153 @@
+import asyncio
+import sys
+
+import tracing
+from . import utils
+
+# Asyncio based command runner. Commands are argv lists (no shell), may have a timeout and
+# can stream their output live. run_steps() executes a set of steps that declare their
+# dependencies, running every step as soon as the steps it depends on have finished, so
+# independent steps (e.g. a snapshot and a 'git fetch') overlap.
+
+
+class CommandError(Exception):
+    def __init__(self, message, argv=None, returncode=None, stdout="", stderr=""):
+        super().__init__(message)
+        self.argv = argv
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+
+
+class Step:
+    """
+    A unit of work for run_steps().
+    action is an argv list, a callable returning an argv list from the results of earlier
+    steps, or a plain function (run in a thread) when python=True.
+    """
+
+    def __init__(self, name, action, deps=(), python=False, timeout=None, stream=False,
+                 check=True, cwd=None, error_message="Command failed"):
+        self.name = name
+        self.action = action
+        self.deps = tuple(deps)
+        self.python = python
+        self.timeout = timeout
+        self.stream = stream
+        self.check = check
+        self.cwd = cwd
+        self.error_message = error_message
+
+
+async def _read_stream(stream, sink, echo):
+    # Read whatever is available rather than whole lines, so prompts without a newline show up
+    while True:
+        chunk = await stream.read(4096)
+        if not chunk:
+            break
+        text = chunk.decode(errors="replace")
+        sink.append(text)
+        if echo is not None:
+            echo.write(text)
+            echo.flush()
+
+
+async def run_async(argv, cwd=None, timeout=None, stream=False, check=True, error_message="Command failed"):
+    """Runs argv. Returns (stdout, stderr, returncode) like utils.run_command; raises CommandError on failure."""
+    # Commands may overlap, so each one gets its own lane in the trace
+    lane = tracing.new_lane(argv[0]) if tracing.enabled() else None
+    with tracing.span(argv[0], "command", lane=lane, argv=" ".join(argv)) as span:
+        stdout_val, stderr_val, returncode = await _run_async(argv, cwd, timeout, stream, error_message)
+        span["returncode"] = returncode
+        span["output_bytes"] = len(stdout_val) + len(stderr_val)
+
+    if check and returncode != 0:
+        if stream:
+            message = f"{error_message} (Exit Code: {returncode})"
+        else:
+            message = f"{error_message} (Exit Code: {returncode}):\nStdout: {stdout_val}\nStderr: {stderr_val}"
+        raise CommandError(message, argv, returncode, stdout_val, stderr_val)
+    return stdout_val, stderr_val, returncode
+
+
+async def _run_async(argv, cwd, timeout, stream, error_message):
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *argv, cwd=cwd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+    except FileNotFoundError:
+        raise CommandError(f"Command not found: {argv[0]}", argv=argv)
+
+    stdout_chunks, stderr_chunks = [], []
+    readers = asyncio.gather(
+        _read_stream(process.stdout, stdout_chunks, sys.stdout if stream else None),
+        _read_stream(process.stderr, stderr_chunks, sys.stderr if stream else None),
+    )
+    try:
+        await asyncio.wait_for(asyncio.shield(readers), timeout)
+        returncode = await process.wait()
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        raise CommandError(f"{error_message} (timed out after {timeout}s): {' '.join(argv)}", argv=argv)
+    except asyncio.CancelledError:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+        raise
+
+    return "".join(stdout_chunks).strip(), "".join(stderr_chunks).strip(), returncode
+
+
+async def _run_steps(steps):
+    results = {}
+    tasks = {}
+
+    async def run_step(step):
+        for dep in step.deps:
+            await tasks[dep]
+        if step.python:
+            lane = tracing.new_lane(step.name) if tracing.enabled() else None
+            with tracing.span(step.name, "step", lane=lane):
+                try:
+                    results[step.name] = await asyncio.to_thread(step.action)
+                except OSError as e:
+                    # e.g. ENOSPC or EPERM; reported like a failed command instead of a traceback
+                    raise CommandError(f"{step.error_message}: {e}") from e
+            return
+        argv = step.action(results) if callable(step.action) else step.action
+        results[step.name] = await run_async(
+            argv, cwd=step.cwd, timeout=step.timeout, stream=step.stream,
+            check=step.check, error_message=step.error_message,
+        )
+
+    for step in steps:
+        missing = [dep for dep in step.deps if dep not in {s.name for s in steps}]
+        if missing:
+            raise ValueError(f"Step '{step.name}' depends on unknown steps: {missing}")
+        tasks[step.name] = asyncio.ensure_future(run_step(step))
+
+    try:
+        await asyncio.gather(*tasks.values())
+    except BaseException:
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        raise
+    return results
+
+
+def run_steps(steps):
+    """Runs steps concurrently in dependency order and returns {name: result}. Exits with an error if a step fails."""
+    try:
+        return asyncio.run(_run_steps(steps))
+    except CommandError as e:
+        utils.error(str(e))
+
+
+def run(argv, cwd=None, timeout=None, stream=False, check=True, error_message="Command failed"):
+    """Runs a single argv command synchronously. Exits with an error if it fails and check is set."""
+    try:
+        return asyncio.run(run_async(argv, cwd, timeout, stream, check, error_message))
+    except CommandError as e:
+        utils.error(str(e))
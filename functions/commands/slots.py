@@ -0,0 +1,99 @@
+import json
+import os
+import subprocess
+import tarfile
+import time
+
+import resymlink
+import tracing
+from . import retention, store, utils
+
+# A/B slots for rollback. Instead of resetting the live checkout, a rollback fills the
+# inactive slot (slots/a or slots/b) with the configs of the target generation and flips
+# the 'current' link that every ~/.config symlink points through. The active tree is
+# never modified, so an interrupted rollback leaves the desktop on the old configs.
+# Only configs are served from a slot; the CLI keeps running from the checkout.
+
+SLOT_NAMES = ("a", "b")
+SLOT_INFO_FILE = ".serein-slot.json"
+
+def get_slot_dir(name):
+    return os.path.join(utils.get_persistent_dir(), resymlink.SLOTS_DIR, name)
+
+def active_slot():
+    """Returns the name of the active slot, or None if configs are served from the checkout."""
+    target = resymlink.get_active_target(utils.get_persistent_dir())
+    name = os.path.basename(target.rstrip("/"))
+    return name if target != resymlink.CHECKOUT and name in SLOT_NAMES else None
+
+def inactive_slot():
+    """Returns the slot a rollback may overwrite."""
+    active = active_slot()
+    return next(name for name in SLOT_NAMES if name != active)
+
+def read_slot_info(name):
+    try:
+        with open(os.path.join(get_slot_dir(name), SLOT_INFO_FILE), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _extract_from_git(commit_hash, dest_dir):
+    # 'git archive' streams the config tree straight from git objects, without touching the checkout
+    persistent_dir = utils.get_persistent_dir()
+    process = subprocess.Popen(
+        ["git", "-C", persistent_dir, "archive", "--format=tar", commit_hash, "config"],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+    )
+    try:
+        with tarfile.open(fileobj=process.stdout, mode="r|") as archive:
+            archive.extractall(dest_dir, **retention.EXTRACT_FILTER)
+    except tarfile.TarError as e:
+        process.kill()
+        utils.error(f"Failed to extract commit {commit_hash}: {e}")
+    finally:
+        process.stdout.close()
+    if process.wait() != 0:
+        utils.error(f"git archive failed for commit {commit_hash}: {process.stderr.read().decode(errors='replace').strip()}")
+
+def prepare_slot(name, generation):
+    """Fills a slot with the configs of a generation, from its backup, its cold archive or else from git."""
+    slot_dir = get_slot_dir(name)
+    tmp_dir = f"{slot_dir}.tmp"
+    utils.remove_tree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    backup_config = os.path.join(store.get_generation_dir(generation["id"]), "config")
+    archive_path = retention.get_archive_path(generation)
+    if os.path.isdir(backup_config):
+        utils.info(f"Preparing slot {name} from the backup of generation {generation['id']}...")
+        with tracing.span("copy_tree", "fs", path=backup_config):
+            store.copy_tree(backup_config, os.path.join(tmp_dir, "config"))
+    elif archive_path and os.path.isfile(archive_path):
+        utils.info(f"Preparing slot {name} from the cold archive of generation {generation['id']}...")
+        with tracing.span("extract_archive", "fs", path=archive_path):
+            retention.extract_archive(archive_path, tmp_dir, prefix="config/")
+    else:
+        utils.info(f"Preparing slot {name} from commit {generation['commit_hash'][:7]}...")
+        with tracing.span("git archive", "command", argv=f"git archive {generation['commit_hash']} config"):
+            _extract_from_git(generation["commit_hash"], tmp_dir)
+
+    # The info file is written last, so a slot without one is known to be incomplete
+    with open(os.path.join(tmp_dir, SLOT_INFO_FILE), "w") as f:
+        json.dump({"generation": generation["id"], "commit_hash": generation["commit_hash"], "prepared_at": time.time()}, f)
+
+    utils.remove_tree(slot_dir, ignore_errors=True)
+    os.rename(tmp_dir, slot_dir)
+
+def activate_slot(name):
+    """Makes every managed config point through 'current', then flips 'current' to the slot."""
+    persistent_dir = utils.get_persistent_dir()
+    resymlink.reconcile_configs(persistent_dir)
+    resymlink.activate(persistent_dir, os.path.join(resymlink.SLOTS_DIR, name))
+
+def activate_checkout():
+    """Serves configs from the checkout again. Returns True if a slot was active."""
+    if active_slot() is None:
+        return False
+    resymlink.activate(utils.get_persistent_dir(), resymlink.CHECKOUT)
+    return True
@@ -0,0 +1,179 @@
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+
+from . import utils
+
+# Top-level entries of the persistent directory that never go into a generation.
+SNAPSHOT_EXCLUDES = {".git", ".gitignore", "generations", "current", "slots"}
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+FICLONE = 0x40049409 # ioctl that makes dest share the extents of source (btrfs, xfs, bcachefs)
+
+# --- Paths ---
+
+def get_generations_dir():
+    """Returns the directory holding generation backups and the object store."""
+    return os.path.join(utils.get_persistent_dir(), "generations")
+
+def get_objects_dir():
+    """Returns the content-addressed object store directory."""
+    return os.path.join(get_generations_dir(), "objects")
+
+def get_generation_dir(gen_id):
+    """Returns the backup directory of a generation."""
+    return os.path.join(get_generations_dir(), str(gen_id))
+
+def get_staging_dir():
+    """Returns the directory a snapshot is built in before it becomes a generation."""
+    return os.path.join(get_generations_dir(), ".staging")
+
+def _stat_cache_path():
+    return os.path.join(get_generations_dir(), "statcache.json")
+
+# --- Objects ---
+
+def hash_file(path):
+    """Returns the sha256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _object_path(digest, executable):
+    # The executable bit is part of the key, since hard links share their mode.
+    name = digest[2:] + ("x" if executable else "")
+    return os.path.join(get_objects_dir(), digest[:2], name)
+
+def _store_object(source_path, digest, executable):
+    """Copies a file into the object store unless an identical object exists. Returns (path, bytes_added)."""
+    object_path = _object_path(digest, executable)
+    if os.path.exists(object_path):
+        return object_path, 0
+
+    os.makedirs(os.path.dirname(object_path), exist_ok=True)
+    tmp_path = f"{object_path}.tmp-{os.getpid()}"
+    shutil.copyfile(source_path, tmp_path)
+    os.chmod(tmp_path, 0o555 if executable else 0o444)
+    os.replace(tmp_path, object_path)
+    return object_path, os.path.getsize(object_path)
+
+def _link_object(object_path, dest_path):
+    try:
+        os.link(object_path, dest_path)
+    except OSError:
+        # Hard link limit reached or unsupported filesystem; fall back to a plain copy.
+        shutil.copy2(object_path, dest_path)
+
+def _clone_file(source_path, dest_path):
+    """Copies a file, as a reflink where the filesystem supports it."""
+    with open(source_path, "rb") as source, open(dest_path, "wb") as dest:
+        try:
+            fcntl.ioctl(dest.fileno(), FICLONE, source.fileno())
+            return
+        except OSError:
+            pass # No copy-on-write support, or source and dest on different filesystems
+    shutil.copyfile(source_path, dest_path) # Copies inside the kernel (sendfile)
+
+def _copy_object(object_path, dest_path):
+    # A writable copy with the usual modes: writes to it must never reach the shared object
+    _clone_file(object_path, dest_path)
+    executable = os.stat(object_path).st_mode & 0o111
+    os.chmod(dest_path, 0o755 if executable else 0o644)
+
+def _load_stat_cache():
+    try:
+        with open(_stat_cache_path(), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_stat_cache(cache):
+    path = _stat_cache_path()
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "w") as f:
+        json.dump(cache, f)
+    os.replace(tmp_path, path)
+
+# --- Snapshots ---
+
+def snapshot_tree(source_dir, dest_dir, excludes=SNAPSHOT_EXCLUDES):
+    """
+    Snapshots source_dir into dest_dir through the object store.
+    Every regular file is stored once by content hash and hard-linked into dest_dir,
+    so an unchanged file costs a stat and a link. Returns (file_count, bytes_added).
+    """
+    stat_cache = _load_stat_cache()
+    new_stat_cache = {}
+    file_count = 0
+    bytes_added = 0
+
+    os.makedirs(dest_dir, exist_ok=True)
+    for root, dirs, files in os.walk(source_dir):
+        rel_root = os.path.relpath(root, source_dir)
+        if rel_root == ".":
+            rel_root = ""
+            dirs[:] = [d for d in dirs if d not in excludes]
+            files = [f for f in files if f not in excludes]
+
+        dest_root = os.path.join(dest_dir, rel_root)
+
+        # Symlinked directories are recreated as links, not descended into.
+        for name in list(dirs):
+            source_path = os.path.join(root, name)
+            if os.path.islink(source_path):
+                dirs.remove(name)
+                os.symlink(os.readlink(source_path), os.path.join(dest_root, name))
+            else:
+                os.makedirs(os.path.join(dest_root, name), exist_ok=True)
+
+        for name in files:
+            source_path = os.path.join(root, name)
+            dest_path = os.path.join(dest_root, name)
+            rel_path = os.path.join(rel_root, name)
+            st = os.lstat(source_path)
+
+            if os.path.islink(source_path):
+                os.symlink(os.readlink(source_path), dest_path)
+                continue
+
+            key = [st.st_size, st.st_mtime_ns, st.st_ino]
+            cached = stat_cache.get(rel_path)
+            if cached and cached[:3] == key:
+                digest = cached[3]
+            else:
+                digest = hash_file(source_path)
+            new_stat_cache[rel_path] = key + [digest]
+
+            object_path, added = _store_object(source_path, digest, bool(st.st_mode & 0o111))
+            _link_object(object_path, dest_path)
+            file_count += 1
+            bytes_added += added
+
+    _save_stat_cache(new_stat_cache)
+    return file_count, bytes_added
+
+def copy_tree(source_dir, dest_dir):
+    """Recreates a snapshot subtree as independent, writable files (reflinked when possible)."""
+    shutil.copytree(source_dir, dest_dir, symlinks=True, copy_function=_copy_object)
+
+def gc_objects():
+    """Removes objects no generation links to anymore. Returns the number of bytes freed."""
+    objects_dir = get_objects_dir()
+    freed = 0
+    if not os.path.isdir(objects_dir):
+        return freed
+
+    for root, _, files in os.walk(objects_dir):
+        for name in files:
+            path = os.path.join(root, name)
+            st = os.lstat(path)
+            # The store's own entry is the only remaining link.
+            if st.st_nlink <= 1:
+                os.remove(path)
+                freed += st.st_size
+    return freed
@@ -0,0 +1,42 @@
+import typer
+from typing_extensions import Annotated
+
+import tracing
+from .utils import error, info
+
+trace_app = typer.Typer(help="Inspect traces recorded with 'serein --trace FILE'.")
+
+@trace_app.command("summary", help="Print the slowest spans of a trace and the time spent per category.")
+def trace_summary(
+    file: Annotated[str, typer.Argument(help="Trace file written by --trace or SEREIN_TRACE.")],
+    limit: Annotated[int, typer.Option("--limit", "-n", help="Number of spans to show.")] = 15
+):
+    try:
+        events = tracing.load(file)
+    except (OSError, ValueError, KeyError) as e:
+        error(f"Could not read trace {file}: {e}")
+
+    spans = [event for event in events if event.get("cat") != "process"]
+    if not spans:
+        info("The trace contains no spans.")
+        return
+
+    typer.echo("Slowest spans:")
+    for event in sorted(spans, key=lambda event: event["dur"], reverse=True)[:limit]:
+        args = event.get("args", {})
+        detail = args.get("argv") or args.get("command") or args.get("path") or args.get("message") or ""
+        if "returncode" in args:
+            detail += f" (exit {args['returncode']})"
+        typer.echo(f"  {event['dur'] / 1000:9.1f} ms  {event['cat']:<8} {event['name']}  {typer.style(detail, dim=True)}")
+
+    totals = {}
+    for event in spans:
+        count, duration = totals.get(event["cat"], (0, 0))
+        totals[event["cat"]] = (count + 1, duration + event["dur"])
+    typer.echo("Per category (overlapping spans are counted in full):")
+    for category, (count, duration) in sorted(totals.items(), key=lambda item: item[1][1], reverse=True):
+        typer.echo(f"  {duration / 1000:9.1f} ms  {category:<8} {count} span(s)")
+
+    wall = max((event["dur"] for event in events if event.get("cat") == "process"), default=None)
+    if wall is not None:
+        info(f"Total run time: {wall / 1000:.1f} ms")
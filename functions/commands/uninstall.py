@@ -4,7 +4,10 @@ import shutil
 import typer
 
 import resymlink
-from . import utils
+from . import pacman, utils
+
+# User units shipped in assets/systemd; they run the serein command, so they go with it
+SYSTEMD_UNITS = ("serein-update-check.timer", "serein-update-check.service", "serein-daemon.service")
 
 
 def uninstall_command():
@@ -31,18 +34,21 @@ def persistent_uninstall():
         packages_to_remove = []
         if os.path.isfile(minimal_packages_path):
             with open(minimal_packages_path, "r") as f:
-                packages_to_remove.extend(f.read().splitlines())
+                packages_to_remove.extend(f.read().split())
         
         if os.path.isfile(os.path.join(persistent_dir, ".full_install")):
             utils.info("Full installation detected. Removing all packages...")
             if os.path.isfile(full_packages_path):
                 with open(full_packages_path, "r") as f:
-                    packages_to_remove.extend(f.read().splitlines())
+                    packages_to_remove.extend(f.read().split())
         else:
             utils.info("Minimal installation detected. Removing minimal packages...")
         
         if packages_to_remove:
-            packages_to_remove = [pkg for pkg in packages_to_remove if pkg.strip()]
+            # Packages that are not installed would make paru fail the whole transaction
+            packages_to_remove, not_installed = pacman.filter_remove(packages_to_remove)
+            if not_installed:
+                utils.info(f"Skipping {len(not_installed)} package(s) that are not installed.")
             if packages_to_remove:
                 _, _, _ = utils.run_command(f"paru -Rns --noconfirm {' '.join(packages_to_remove)}", error_message="Failed to remove packages")
             else:
@@ -53,6 +59,8 @@ def persistent_uninstall():
     utils.info("Unsymlinking configurations...")
     resymlink.unsymlink_configs(persistent_dir)
 
+    remove_systemd_units()
+
     # Remove serein executable
     serein_bin_path = "/usr/local/bin/serein"
     if os.path.exists(serein_bin_path):
@@ -61,7 +69,7 @@ def persistent_uninstall():
 
     # Remove persistent directory
     utils.info(f"Removing Serein persistent directory: {persistent_dir}")
-    shutil.rmtree(persistent_dir)
+    utils.remove_tree(persistent_dir)
 
     cleanup_cache()
     utils.info("Serein has been uninstalled.")
@@ -83,7 +91,7 @@ def one_time_uninstall():
         if os.path.isdir(target_path) and not os.path.islink(target_path):
             if utils.confirm_action(f"Found config directory '{cfg}'. Do you want to remove it?"):
                 try:
-                    shutil.rmtree(target_path)
+                    utils.remove_tree(target_path)
                     utils.info(f"Removed directory: {target_path}")
                 except OSError as e:
                     utils.error(f"Failed to remove {target_path}: {e}")
@@ -97,19 +105,41 @@ def one_time_uninstall():
     cleanup_cache()
     utils.info("Serein has been uninstalled.")
 
+def remove_systemd_units():
+    """Stops and disables Serein's systemd user units and removes their unit files."""
+    unit_dir = os.path.join(os.path.expanduser("~"), ".config", "systemd", "user")
+    installed = [unit for unit in SYSTEMD_UNITS if os.path.lexists(os.path.join(unit_dir, unit))]
+    if not installed:
+        return
+    if not shutil.which("systemctl"):
+        utils.info(f"systemctl not found; remove {', '.join(installed)} from {unit_dir} manually.")
+        return
+
+    utils.info(f"Disabling systemd user units: {', '.join(installed)}")
+    for unit in installed:
+        # Units that were never enabled or started are fine
+        utils.run_command(f"systemctl --user disable --now {unit}", check_error=False)
+        os.remove(os.path.join(unit_dir, unit))
+    utils.run_command("systemctl --user daemon-reload", check_error=False)
+
 def cleanup_cache():
     """Removes common cache directories."""
     utils.info("Cleaning up cache directories...")
+    state_dir = utils.get_state_dir()
+    if os.path.isdir(state_dir):
+        # hyprpm and pacman caches, the update check result and the bytecode bundles
+        utils.info(f"Removing Serein state: {state_dir}")
+        utils.remove_tree(state_dir)
     rofi_cache = os.path.join(os.path.expanduser("~"), ".cache", "rofi")
     rofi_icon_cache = os.path.join(os.path.expanduser("~"), ".cache", "rofi_icon")
     user_conf = os.path.join(os.path.expanduser("~"), "user.conf")
 
     if os.path.isdir(rofi_cache):
         utils.info(f"Removing Rofi cache: {rofi_cache}")
-        shutil.rmtree(rofi_cache)
+        utils.remove_tree(rofi_cache)
     if os.path.isdir(rofi_icon_cache):
         utils.info(f"Removing Rofi icon cache: {rofi_icon_cache}")
-        shutil.rmtree(rofi_icon_cache)
+        utils.remove_tree(rofi_icon_cache)
     if os.path.isfile(user_conf):
         utils.info(f"Removing user.conf: {user_conf}")
         os.remove(user_conf)
@@ -1,6 +1,6 @@
 import os
-import shutil
 import sys
+import time
 from datetime import datetime
 from typing import Optional
 from typing_extensions import Annotated
@@ -8,98 +8,119 @@ from typing_extensions import Annotated
 import typer
 
 import resymlink
-from . import utils
+from . import bytecode, changes, retention, runner, slots, store, updatecheck, utils
+from .runner import Step
 
 
 def update_command(
     update_type: Annotated[Optional[str], typer.Argument(help="Update type: 'stable' for latest tag, 'edge' for git pull (default)")] = "edge",
-    force: Annotated[bool, typer.Option("--force", "-f", help="Force update even if on the latest version.")] = False
+    force: Annotated[bool, typer.Option("--force", "-f", help="Force update even if on the latest version.")] = False,
+    check: Annotated[bool, typer.Option("--check", help="Report whether an update is available from the last background fetch, without touching the network.")] = False,
+    fetch: Annotated[bool, typer.Option("--fetch", help="Fetch from the remote and record the result for --check, without updating.")] = False
 ):
     if not utils.is_persistent_install():
         utils.error("Serein is not installed persistently. Cannot update.")
     
     persistent_dir = utils.get_persistent_dir()
 
-    utils.info("Checking for rsync...")
-    if not shutil.which("rsync"):
-        utils.error("rsync is not installed. Please install it to continue.")
-
-    original_cwd = os.getcwd()
-
-    # Create a temporary backup of the current persistent_dir (pre-update state)
-    temp_backup_dir = os.path.join(os.path.expanduser("~"), ".cache", "serein_temp_backup")
-    shutil.rmtree(temp_backup_dir, ignore_errors=True) # Clean up any previous temp
-    os.makedirs(temp_backup_dir, exist_ok=True)
-
-    utils.info(f"Creating temporary backup of current state at {temp_backup_dir}...")
-    rsync_temp_command = [
-        "rsync", "-a",
-        "--exclude=.git",
-        "--exclude=.gitignore",
-        "--exclude=generations",
-        f"{persistent_dir}/", # Source directory (current state)
-        f"{temp_backup_dir}/" # Destination directory
+    if fetch:
+        state = updatecheck.fetch_and_record(persistent_dir)
+        report_check(state, update_type)
+        return
+
+    if check:
+        state = updatecheck.read_check()
+        if state is None:
+            utils.info("No update check has been recorded yet. Run 'serein update --fetch' first.")
+            return
+        report_check(state, update_type)
+        return
+
+    # Snapshot the current persistent_dir (pre-update state) into a staging generation.
+    # Files are hard-linked from the object store, so only changed files cost disk I/O.
+    staging_dir = store.get_staging_dir()
+    utils.remove_tree(staging_dir, ignore_errors=True) # Clean up any interrupted snapshot
+
+    def git(*args):
+        return ["git", "-C", persistent_dir, *args]
+
+    # The snapshot only has to finish before the working tree changes, so it runs
+    # concurrently with the network fetch and the read-only git queries.
+    def snapshot():
+        try:
+            return store.snapshot_tree(persistent_dir, staging_dir)
+        except OSError:
+            utils.remove_tree(staging_dir, ignore_errors=True) # Don't leave a partial snapshot behind
+            raise
+
+    steps = [
+        Step("snapshot", snapshot, python=True, error_message="Failed to create temporary backup"),
+        Step("before_hash", git("rev-parse", "HEAD"), error_message="Failed to get current git hash"),
     ]
-    _, _, _ = utils.run_command(" ".join(rsync_temp_command), error_message="Failed to create temporary backup")
+    # Objects from a recent background fetch are reused instead of fetching again
+    fetch_deps = []
+    if updatecheck.fetch_is_fresh():
+        utils.info("Reusing the recent background fetch.")
+    else:
+        # Edge only needs its branch, like 'git pull'; tags would pull in extra commits and trees on shallow clones
+        fetch_args = ("fetch", "--tags") if update_type == "stable" else ("fetch",)
+        steps.append(Step("fetch", git(*fetch_args), error_message="git fetch failed"))
+        fetch_deps = ["fetch"]
 
-    # Change to persistent_dir for git operations
-    os.chdir(persistent_dir)
+    if update_type == "stable":
+        utils.info("Checking for stable updates...")
+        steps += [
+            Step("latest_rev", git("rev-list", "--tags", "--max-count=1"), deps=fetch_deps, error_message="Failed to get latest tag"),
+            Step("latest_tag", lambda results: git("describe", "--tags", results["latest_rev"][0]), deps=["latest_rev"], error_message="Failed to get latest tag"),
+            Step("current_tag", git("describe", "--tags"), error_message="Failed to get current tag"),
+        ]
+    else:
+        utils.info("Updating to the bleeding edge (git pull)...")
 
-    before_hash, _, _ = utils.run_command("git rev-parse HEAD", error_message="Failed to get current git hash")
+    utils.info("Snapshotting current state...")
+    results = runner.run_steps(steps)
+    file_count, bytes_added = results["snapshot"]
+    utils.info(f"Snapshotted {file_count} files ({bytes_added} new bytes stored).")
+    before_hash = results["before_hash"][0]
+    fetched_at = time.time() if "fetch" in results else None
 
     # Perform the git update
     if update_type == "stable":
-        utils.info("Checking for stable updates...")
-        _, _, _ = utils.run_command("git fetch --tags", error_message="git fetch failed")
-        latest_tag, _, _ = utils.run_command("git describe --tags $(git rev-list --tags --max-count=1)", error_message="Failed to get latest tag")
-        current_tag, _, _ = utils.run_command("git describe --tags", error_message="Failed to get current tag")
+        latest_tag = results["latest_tag"][0]
+        current_tag = results["current_tag"][0]
 
         if current_tag == latest_tag and not force:
             utils.info("You are already on the latest stable release.")
-            os.chdir(original_cwd) # Change back before exiting
-            shutil.rmtree(temp_backup_dir) # Clean up temp
+            utils.remove_tree(staging_dir) # Clean up staging snapshot
+            return_to_checkout()
+            updatecheck.write_check(updatecheck.collect_state(persistent_dir, fetched_at))
             sys.exit(0)
 
         utils.info(f"Updating to the latest stable release ({latest_tag})...")
-        _, _, _ = utils.run_command(f"git checkout {latest_tag}", error_message="git checkout failed. You may have local changes. Please stash or commit them first.")
+        runner.run(git("checkout", latest_tag), error_message="git checkout failed. You may have local changes. Please stash or commit them first.")
     else:
-        utils.info("Updating to the bleeding edge (git pull)...")
-        _, _, _ = utils.run_command("git pull", error_message="git pull failed. You may have local changes. Please stash or commit them first.")
+        # The fetch already happened above, so only the fast-forward is left of 'git pull'
+        runner.run(git("merge", "--ff-only", "@{u}"), error_message="git pull failed. You may have local changes. Please stash or commit them first.")
 
-    after_hash, _, _ = utils.run_command("git rev-parse HEAD", error_message="Failed to get new git hash")
+    after_hash, _, _ = runner.run(git("rev-parse", "HEAD"), error_message="Failed to get new git hash")
 
     # If no changes, no new generation needed
     if before_hash == after_hash and not force:
         utils.info("Already up to date. No new generation created.")
-        os.chdir(original_cwd) # Change back before exiting
-        shutil.rmtree(temp_backup_dir) # Clean up temp
+        utils.remove_tree(staging_dir) # Clean up staging snapshot
+        return_to_checkout()
+        updatecheck.write_check(updatecheck.collect_state(persistent_dir, fetched_at))
         sys.exit(0)
 
-    # Change back to original CWD before creating backup
-    os.chdir(original_cwd)
-
-    # Create generation backup from the *temporary backup* (pre-update state)
-    generations = utils.read_generations()
-    last_gen_id = generations[-1]["id"] if generations else 0
-    new_gen_id = last_gen_id + 1
-
-    backup_dir = os.path.join(utils.get_persistent_dir(), "generations", str(new_gen_id))
-    os.makedirs(backup_dir, exist_ok=True)
+    # Promote the staging snapshot (pre-update state) to a generation backup
+    journal = utils.get_journal()
+    new_gen_id = journal.last_id() + 1
 
+    backup_dir = store.get_generation_dir(new_gen_id)
     utils.info(f"Creating generation backup {new_gen_id} of previous state at {backup_dir}...")
+    os.rename(staging_dir, backup_dir)
 
-    # Use rsync to copy files from the *temporary backup* (pre-update state)
-    rsync_command = [
-        "rsync", "-a",
-        "--exclude=.git",
-        "--exclude=.gitignore",
-        "--exclude=generations",
-        f"{temp_backup_dir}/", # Source directory (pre-update state from temp)
-        f"{backup_dir}/"      # Destination directory
-    ]
-    _, _, _ = utils.run_command(" ".join(rsync_command), error_message="Failed to create generation backup")
-
-    # Add new generation to the JSON file
+    # Record the new generation in the journal
     new_generation = {
         "id": new_gen_id,
         "date": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
@@ -107,18 +128,41 @@ def update_command(
         "description": f"Update to {after_hash[:7]}",
         "archived": False
     }
-    generations.append(new_generation)
-    utils.write_generations(generations)
-    
-    shutil.rmtree(temp_backup_dir) # Clean up the temporary backup directory
-
-    # Unsymlink configs
-    utils.info("Unsymlinking existing configurations...")
-    resymlink.unsymlink_configs(persistent_dir)
+    journal.add(new_generation)
+
+    # Only act on the components whose files changed between the two commits
+    components = changes.group_changes(changes.changed_paths(persistent_dir, before_hash, after_hash))
+    changes.print_summary(components)
+    if before_hash == after_hash:
+        # Forced update without new commits: re-apply everything
+        utils.info("Reconciling configurations...")
+        resymlink.reconcile_configs(persistent_dir)
+        bytecode.ensure_bundle(persistent_dir)
+    else:
+        changes.apply_changes(persistent_dir, components)
 
-    # Resymlink configs
-    utils.info("Symlinking new configurations...")
-    resymlink.symlink_configs(persistent_dir)
+    return_to_checkout()
+    updatecheck.write_check(updatecheck.collect_state(persistent_dir, fetched_at))
 
+    # Age out old generations into cold archives; whatever does not fit the time budget waits for the next update
+    _, remaining = retention.apply_policy(journal)
+    if remaining:
+        utils.info(f"{remaining} generation(s) will be archived on the next update.")
     utils.info("Update complete. A new generation has been created.")
-    utils.clear_pycache()
+
+def return_to_checkout():
+    """Serves configs from the updated checkout again if a rollback slot was active."""
+    if slots.activate_checkout():
+        utils.info("Switched configurations from the rollback slot back to the checkout.")
+
+def report_check(state, update_type):
+    """Prints whether an update is available according to a recorded update check."""
+    checked = datetime.fromtimestamp(state["fetched_at"]).strftime('%Y-%m-%d %H:%M:%S') if state.get("fetched_at") else "never"
+    available = updatecheck.updates_available(state, update_type)
+    if available is None:
+        utils.info(f"Could not determine {update_type} updates from the last check (fetched: {checked}).")
+    elif available:
+        target = state["latest_tag"] if update_type == "stable" else state["edge_head"][:7]
+        utils.info(f"An update is available: {target} (fetched: {checked}).")
+    else:
+        utils.info(f"Serein is up to date (fetched: {checked}).")
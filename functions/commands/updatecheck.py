@@ -0,0 +1,91 @@
+import json
+import os
+import time
+
+from . import runner, utils
+from .runner import Step
+
+# Background update checking. 'serein update --fetch' (run on demand or from the
+# serein-update-check systemd user timer) fetches from the remote and records the latest
+# tag and edge head in a small JSON file, which 'serein update --check' and status bar
+# modules read without touching the network. A real update reuses a recent fetch.
+
+# A fetch younger than this is reused by 'serein update' instead of fetching again
+FETCH_REUSE_SECONDS = 15 * 60
+
+def get_check_path():
+    """Returns the path of the cached update check result."""
+    return os.path.join(utils.get_state_dir(), "update_check.json")
+
+def read_check():
+    """Returns the cached update check result, or None if there is none."""
+    try:
+        with open(get_check_path(), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def write_check(state):
+    path = get_check_path()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=4)
+    os.replace(tmp_path, path)
+
+def collect_state(persistent_dir, fetched_at=None):
+    """Collects the local and already fetched remote git state, without touching the network."""
+    def git(*args):
+        return ["git", "-C", persistent_dir, *args]
+
+    results = runner.run_steps([
+        Step("head", git("rev-parse", "HEAD"), error_message="Failed to get current git hash"),
+        Step("current_tag", git("describe", "--tags"), check=False),
+        Step("latest_rev", git("rev-list", "--tags", "--max-count=1"), check=False),
+        Step("latest_tag", lambda results: git("describe", "--tags", results["latest_rev"][0] or "HEAD"), deps=["latest_rev"], check=False),
+        Step("edge_head", git("rev-parse", "@{u}"), check=False), # Stable installs have no upstream
+        # Exits 0 if HEAD is contained in the edge head, i.e. the checkout is not ahead of it or diverged
+        Step("behind_edge", git("merge-base", "--is-ancestor", "HEAD", "@{u}"), check=False),
+    ])
+
+    def value(name):
+        stdout, _, returncode = results[name]
+        return stdout if returncode == 0 and stdout else None
+
+    previous = read_check() or {}
+    return {
+        "checked_at": time.time(),
+        "fetched_at": fetched_at if fetched_at is not None else previous.get("fetched_at"),
+        "head": value("head"),
+        "current_tag": value("current_tag"),
+        "latest_tag": value("latest_tag") if value("latest_rev") else None,
+        "edge_head": value("edge_head"),
+        "behind_edge": {0: True, 1: False}.get(results["behind_edge"][2]),
+    }
+
+def fetch_and_record(persistent_dir):
+    """Fetches tags and the upstream branch, then records the result. Returns the recorded state."""
+    runner.run(["git", "-C", persistent_dir, "fetch", "--tags"], error_message="git fetch failed")
+    state = collect_state(persistent_dir, fetched_at=time.time())
+    write_check(state)
+    return state
+
+def fetch_is_fresh():
+    """Returns True if a recent background fetch can be reused instead of fetching again."""
+    state = read_check()
+    if not state or not state.get("fetched_at"):
+        return False
+    return time.time() - state["fetched_at"] < FETCH_REUSE_SECONDS
+
+def updates_available(state, update_type):
+    """Returns True/False from a recorded state, or None if the state does not tell."""
+    if update_type == "stable":
+        if not state.get("latest_tag"):
+            return None
+        return state.get("current_tag") != state["latest_tag"]
+    if not state.get("edge_head"):
+        return None
+    if state.get("head") == state["edge_head"]:
+        return False
+    # A checkout that is ahead of or diverged from the edge head has nothing to fast-forward to
+    return state.get("behind_edge")
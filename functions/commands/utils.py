@@ -8,62 +8,75 @@ from typing import Optional
 from typing_extensions import Annotated
 
 import typer
-from InquirerPy import inquirer
-from InquirerPy.utils import get_style
 
+import daemonclient
 import resymlink
-import json
+import tracing
+from hypripc import HyprlandIPC, HyprlandIPCError
+from .journal import GenerationJournal
 
 # --- Helper Functions ---
 
+_journal = None
+
 def get_generations_path():
-    """Returns the path to the generations.json file."""
+    """Returns the path to the legacy generations.json file."""
     return os.path.join(get_persistent_dir(), "generations.json")
 
+def get_journal_path():
+    """Returns the path to the generation journal."""
+    return os.path.join(get_persistent_dir(), "generations.log")
+
+def get_journal():
+    """Returns the generation journal, loading it once per process. Migrates generations.json if needed."""
+    global _journal
+    if _journal is None:
+        try:
+            _journal = GenerationJournal(get_journal_path(), legacy_path=get_generations_path())
+        except (OSError, ValueError) as e:
+            error(f"Could not read the generation journal: {e}")
+    return _journal
+
+def list_generations():
+    """Returns the non-archived generations, oldest first, from a running 'serein daemon' when possible."""
+    state = daemonclient.query("generations")
+    if state is not None:
+        return state["generations"]
+    return get_journal().available()
+
 def read_generations():
-    """Reads and parses the generations.json file. Creates it if it doesn't exist."""
-    generations_path = get_generations_path()
-    if not os.path.exists(generations_path):
-        # If the file doesn't exist, create it with an empty list
-        with open(generations_path, "w") as f:
-            json.dump({"generations": []}, f, indent=4)
-        return []
-    try:
-        with open(generations_path, "r") as f:
-            data = json.load(f)
-            # Basic validation
-            if "generations" in data and isinstance(data["generations"], list):
-                return data["generations"]
-            else:
-                # Handle corrupted or invalid format
-                error("generations.json is malformed. Please fix or delete it.")
-                return [] # Should not be reached due to error()
-    except (json.JSONDecodeError, FileNotFoundError):
-        error("Could not read or parse generations.json. Please fix or delete it.")
-        return [] # Should not be reached due to error()
-
-def write_generations(generations_data):
-    """Writes the given data to the generations.json file."""
-    generations_path = get_generations_path()
-    with open(generations_path, "w") as f:
-        json.dump({"generations": generations_data}, f, indent=4)
-import typer
-from rich.console import Console
-from rich.style import Style
+    """Returns all generations, archived included, oldest first."""
+    return get_journal().all()
+
+_consoles = {}
 
-console = Console()
+def get_console(stderr=False):
+    """Returns the shared rich console for stdout or stderr. rich is only imported once something is printed."""
+    if stderr not in _consoles:
+        from rich.console import Console
+        _consoles[stderr] = Console(stderr=stderr)
+    return _consoles[stderr]
 
 
 def info(message):
     """Displays an informational message."""
+    # Piped output (status bars, scripts) gets plain lines; rich would only strip the style and wrap them
+    if not sys.stdout.isatty():
+        print(f"[INFO] {message}", flush=True)
+        return
+    from rich.style import Style
     style = Style(color="#86afef", bold=True)
-    console.print(f"[INFO] {message}", style=style)
+    get_console().print(f"[INFO] {message}", style=style)
 
 
 def error(message):
     """Displays an error message and exits the script."""
+    if not sys.stderr.isatty():
+        print(f"[ERROR] {message}", file=sys.stderr, flush=True)
+        sys.exit(1)
+    from rich.style import Style
     style = Style(color="red", bold=True)
-    console.print(f"[ERROR] {message}", style=style, stderr=True)
+    get_console(stderr=True).print(f"[ERROR] {message}", style=style)
     sys.exit(1)
 
 def run_command(command, cwd=None, check_error=True, error_message="Command failed", capture_output=True):
@@ -71,8 +84,11 @@ def run_command(command, cwd=None, check_error=True, error_message="Command fail
     try:
         # If we don't capture output, it will be streamed to the terminal directly.
         # In that case, result.stdout and result.stderr will be None.
-        result = subprocess.run(command, cwd=cwd, check=False, shell=True, capture_output=capture_output, text=True)
-        
+        with tracing.span(command.split()[0], "command", command=command) as span:
+            result = subprocess.run(command, cwd=cwd, check=False, shell=True, capture_output=capture_output, text=True)
+            span["returncode"] = result.returncode
+            span["output_bytes"] = len(result.stdout or "") + len(result.stderr or "")
+
         stdout_val = result.stdout.strip() if result.stdout else ""
         stderr_val = result.stderr.strip() if result.stderr else ""
 
@@ -89,9 +105,20 @@ def run_command(command, cwd=None, check_error=True, error_message="Command fail
     except Exception as e:
         error(f"An unexpected error occurred while running command: {command}\nError: {e}")
 
+def remove_tree(path, ignore_errors=False):
+    """Removes a directory tree. The removal is recorded when tracing."""
+    with tracing.span("rmtree", "fs", path=path):
+        shutil.rmtree(path, ignore_errors=ignore_errors)
+
 def confirm_action(prompt):
     """Prompts the user for confirmation."""
-    return typer.confirm(prompt)
+    with tracing.span("confirm", "prompt", message=prompt):
+        return typer.confirm(prompt)
+
+def ask(question):
+    """Executes an InquirerPy prompt and returns the answer. The wait is recorded when tracing."""
+    with tracing.span("ask", "prompt", message=getattr(question, "_message", None)):
+        return question.execute()
 
 def is_persistent_install():
     """Checks if Serein is installed persistently."""
@@ -101,35 +128,36 @@ def get_persistent_dir():
     """Returns the persistent directory path."""
     return os.path.join(os.path.expanduser("~"), ".cache", "serein")
 
-def clear_pycache():
-    """Removes all __pycache__ directories within the functions directory."""
-    functions_dir = os.path.dirname(os.path.abspath(__file__))
-    for root, dirs, files in os.walk(functions_dir):
-        if "__pycache__" in dirs:
-            pycache_dir = os.path.join(root, "__pycache__")
-            shutil.rmtree(pycache_dir)
+def get_source_dir():
+    """Returns the directory Serein runs from (the checkout holding functions/ and assets/)."""
+    # Set by the launcher when the CLI runs from a bytecode bundle, whose __file__ is in the cache
+    source_dir = os.environ.get("SEREIN_SOURCE_DIR")
+    if source_dir:
+        return source_dir
+    return os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def get_state_dir():
+    """Returns the directory for caches and runtime state. Kept outside the git checkout."""
+    return os.path.join(os.path.expanduser("~"), ".cache", "serein_state")
 
 def is_overview_enabled():
     """Checks if the hyprtasking plugin for overview is enabled via hyprpm."""
-    stdout, _, returncode = run_command("hyprpm list", check_error=False)
-    if returncode != 0:
-        return False
-
-    lines = stdout.lower().splitlines()
-    in_hyprtasking_section = False
-    for line in lines:
-        # A new repository section resets the check
-        if 'repository ' in line:
-            if 'hyprtasking' in line:
-                in_hyprtasking_section = True
-            else:
-                in_hyprtasking_section = False
-        
-        if in_hyprtasking_section:
-            if 'enabled:' in line and 'true' in line:
-                return True
-                
-    return False
+    from . import hyprpm
+    return hyprpm.is_plugin_enabled("hyprtasking")
+
+def get_hyprland_ipc():
+    """Returns a Hyprland IPC client, or exits with an error if Hyprland is not running."""
+    try:
+        return HyprlandIPC()
+    except HyprlandIPCError as e:
+        error(str(e))
+
+def reload_hyprland():
+    """Reloads the Hyprland config over the IPC socket."""
+    try:
+        get_hyprland_ipc().reload()
+    except HyprlandIPCError as e:
+        error(f"Hyprland reload failed: {e}")
 
 def paru_install(packages):
     command = f"paru -S --noconfirm {' '.join(packages)}"
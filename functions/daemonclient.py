@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+
+# Client for the 'serein daemon' query socket.
+#
+# The daemon keeps config, symlink, generation and plugin state in memory and answers
+# one JSON request per connection: {"query": "<name>"} followed by a newline, replied to
+# with {"ok": true, "data": ...}. query() returns None when no daemon is running, so
+# callers can fall back to scanning the filesystem themselves.
+#
+# Standalone usage (for status bar modules, no typer/rich import):
+#   daemonclient.py [status|configs|generations|plugins|ping|refresh]
+
+import json
+import os
+import socket
+import sys
+
+QUERIES = ("status", "configs", "generations", "plugins", "ping", "refresh")
+RECV_SIZE = 65536
+
+
+def get_socket_path():
+    """Returns the path of the daemon's Unix socket."""
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir:
+        return os.path.join(runtime_dir, "serein.sock")
+    return f"/tmp/serein-{os.getuid()}.sock"
+
+
+def query(name, timeout=1.0, socket_path=None):
+    """Sends a query to the daemon and returns its data, or None if the daemon is not running."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(socket_path or get_socket_path())
+        sock.sendall(json.dumps({"query": name}).encode() + b"\n")
+        chunks = []
+        while True:
+            chunk = sock.recv(RECV_SIZE)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        reply = json.loads(b"".join(chunks))
+    except (OSError, ValueError):
+        return None
+    finally:
+        sock.close()
+    return reply.get("data") if reply.get("ok") else None
+
+
+def main(argv):
+    name = argv[0] if argv else "status"
+    if name not in QUERIES:
+        print(f"usage: daemonclient.py [{'|'.join(QUERIES)}]", file=sys.stderr)
+        return 2
+    data = query(name)
+    if data is None:
+        print("daemonclient: serein daemon is not running", file=sys.stderr)
+        return 1
+    print(json.dumps(data))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
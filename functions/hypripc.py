@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+
+# Minimal client for Hyprland's IPC sockets, used instead of spawning hyprctl.
+#
+# Requests go to $XDG_RUNTIME_DIR/hypr/<signature>/.socket.sock. Hyprland answers one
+# request per connection and closes it, so a client object resolves the socket path once
+# and opens a cheap Unix connection per request; batching ([[BATCH]]) is the way to send
+# several commands in a single round trip. Events are read from .socket2.sock.
+#
+# Only for code that already runs in Python; shell scripts should call hyprctl, which starts
+# far faster than an interpreter. Standalone usage (for debugging, mirrors hyprctl):
+#   hypripc.py [-j] [--batch] command...
+
+import json
+import os
+import socket
+import sys
+
+RECV_SIZE = 65536
+
+
+class HyprlandIPCError(Exception):
+    pass
+
+
+def find_instance_dir(runtime_dir=None, signature=None):
+    """Returns the socket directory of the running Hyprland instance."""
+    signature = signature or os.environ.get("HYPRLAND_INSTANCE_SIGNATURE")
+    candidates = []
+    if runtime_dir:
+        candidates.append(runtime_dir)
+    else:
+        if os.environ.get("XDG_RUNTIME_DIR"):
+            candidates.append(os.path.join(os.environ["XDG_RUNTIME_DIR"], "hypr"))
+        candidates.append("/tmp/hypr") # Hyprland < 0.40
+
+    for base in candidates:
+        if signature:
+            if os.path.isdir(os.path.join(base, signature)):
+                return os.path.join(base, signature)
+            continue
+        # No signature in the environment (e.g. over SSH): use the newest instance
+        try:
+            entries = [os.path.join(base, entry) for entry in os.listdir(base)]
+        except OSError:
+            continue
+        instances = [entry for entry in entries if os.path.exists(os.path.join(entry, ".socket.sock"))]
+        if instances:
+            return max(instances, key=os.path.getmtime)
+
+    raise HyprlandIPCError("Could not find a running Hyprland instance.")
+
+
+class HyprlandIPC:
+    def __init__(self, instance_dir=None, timeout=5.0):
+        self.instance_dir = instance_dir or find_instance_dir()
+        self.socket_path = os.path.join(self.instance_dir, ".socket.sock")
+        self.event_socket_path = os.path.join(self.instance_dir, ".socket2.sock")
+        self.timeout = timeout
+
+    def _send(self, payload):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+            sock.sendall(payload.encode())
+            chunks = []
+            while True:
+                chunk = sock.recv(RECV_SIZE)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+        except OSError as e:
+            raise HyprlandIPCError(f"Hyprland IPC request '{payload}' failed: {e}") from e
+        finally:
+            sock.close()
+        return b"".join(chunks).decode(errors="replace")
+
+    def request(self, command, json_output=False):
+        """Sends a single command. With json_output the reply is parsed from Hyprland's JSON output."""
+        if not json_output:
+            return self._send(f"/{command}")
+        reply = self._send(f"j/{command}")
+        try:
+            return json.loads(reply)
+        except ValueError as e:
+            raise HyprlandIPCError(f"Invalid JSON reply to '{command}': {reply[:200]}") from e
+
+    def batch(self, commands):
+        """Sends several commands in one round trip and returns Hyprland's combined reply."""
+        return self._send("[[BATCH]]" + ";".join(commands))
+
+    def dispatch(self, dispatcher, args=""):
+        """Runs a dispatcher, raising HyprlandIPCError unless Hyprland replies 'ok'."""
+        reply = self.request(f"dispatch {dispatcher} {args}".rstrip())
+        if reply.strip() != "ok":
+            raise HyprlandIPCError(f"dispatch {dispatcher} failed: {reply.strip()}")
+
+    def reload(self):
+        """Reloads the Hyprland config."""
+        reply = self.request("reload")
+        if reply.strip() != "ok":
+            raise HyprlandIPCError(f"reload failed: {reply.strip()}")
+
+    def events(self):
+        """Yields (event, data) tuples from the event socket until it closes."""
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self.event_socket_path)
+            buffer = b""
+            while True:
+                chunk = sock.recv(RECV_SIZE)
+                if not chunk:
+                    return
+                buffer += chunk
+                *lines, buffer = buffer.split(b"\n")
+                for line in lines:
+                    event, _, data = line.decode(errors="replace").partition(">>")
+                    yield event, data
+        except OSError as e:
+            raise HyprlandIPCError(f"Hyprland event socket failed: {e}") from e
+        finally:
+            sock.close()
+
+
+def main(argv):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="hypripc", description="Talk to Hyprland over its IPC socket.")
+    parser.add_argument("-j", "--json", action="store_true", help="request JSON output")
+    parser.add_argument("--batch", action="store_true", help="send all arguments as one [[BATCH]] request, separated by ';'")
+    parser.add_argument("command", nargs="+")
+    args = parser.parse_args(argv)
+
+    try:
+        ipc = HyprlandIPC()
+        if args.batch:
+            print(ipc.batch(" ".join(args.command).split(";")))
+        elif args.json:
+            print(json.dumps(ipc.request(" ".join(args.command), json_output=True)))
+        else:
+            print(ipc.request(" ".join(args.command)))
+    except HyprlandIPCError as e:
+        print(f"hypripc: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -192,9 +192,12 @@ run_stage_2() {
     local ROFI_IMG_PATH="$HOME/.cache/rofi"
     if [ "$INSTALL_MODE" == "persistent" ]; then
         info "Symlinking new configurations for persistent installation..."
+        # Configs are linked through $REPO_ROOT/current, which 'serein rollback' flips to a slot
+        ln -sfn . "$REPO_ROOT/current"
+        printf '/current\n/slots/\n' >> "$REPO_ROOT/.git/info/exclude"
         for cfg in "${configs_to_install[@]}"; do
             info "Symlinking config: $cfg"
-            ln -s "$REPO_CONFIG_DIR/$cfg" "$CONFIG_DIR/$cfg"
+            ln -s "$REPO_ROOT/current/config/$cfg" "$CONFIG_DIR/$cfg"
         done
         cp "$REPO_CONFIG_DIR/user.conf" "$HOME"
         mkdir -p "$ROFI_IMG_PATH"
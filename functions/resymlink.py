@@ -1,5 +1,9 @@
 import os
+import shutil
 import sys
+from collections import namedtuple
+
+import tracing
 
 def info(message):
     """Displays an informational message."""
@@ -23,49 +27,170 @@ def get_configs_to_manage(persistent_dir):
         configs_to_manage.extend(CONFIGS_EXTRA)
     return configs_to_manage
 
-def symlink_configs(persistent_dir):
-    info("Symlinking configurations...")
-    REPO_CONFIG_DIR = os.path.join(persistent_dir, "config")
-    configs = get_configs_to_manage(persistent_dir)
-    for cfg in configs:
-        source_path = os.path.join(REPO_CONFIG_DIR, cfg)
+def get_source_path(persistent_dir, cfg):
+    """Returns the path a managed config symlink points to, through the 'current' link."""
+    return os.path.join(persistent_dir, CURRENT_LINK, "config", cfg)
+
+def get_legacy_source_path(persistent_dir, cfg):
+    """Returns the path older installs linked configs to, straight into the checkout."""
+    return os.path.join(persistent_dir, "config", cfg)
+
+# --- Active Tree ---
+# Managed symlinks point through <persistent_dir>/current, which in turn points at the
+# checkout (".") or at a rollback slot (slots/a or slots/b). Switching the tree every
+# config is served from is then a single atomic rename, however many configs there are.
+
+CURRENT_LINK = "current"
+SLOTS_DIR = "slots"
+CHECKOUT = "."
+
+def get_active_target(persistent_dir):
+    """Returns what 'current' points at, relative to the persistent dir ('.' if not set up yet)."""
+    try:
+        return os.readlink(os.path.join(persistent_dir, CURRENT_LINK))
+    except OSError:
+        return CHECKOUT
+
+def _exclude_from_git(persistent_dir, patterns):
+    exclude_path = os.path.join(persistent_dir, ".git", "info", "exclude")
+    try:
+        with open(exclude_path, "r") as f:
+            existing = set(f.read().splitlines())
+    except FileNotFoundError:
+        existing = set()
+    missing = [pattern for pattern in patterns if pattern not in existing]
+    if missing and os.path.isdir(os.path.dirname(os.path.dirname(exclude_path))):
+        os.makedirs(os.path.dirname(exclude_path), exist_ok=True)
+        with open(exclude_path, "a") as f:
+            f.write("".join(f"{pattern}\n" for pattern in missing))
+
+def ensure_current_link(persistent_dir):
+    """Creates the 'current' link pointing at the checkout if it does not exist yet."""
+    current_path = os.path.join(persistent_dir, CURRENT_LINK)
+    if not os.path.lexists(current_path):
+        _exclude_from_git(persistent_dir, [f"/{CURRENT_LINK}", f"/{SLOTS_DIR}/"])
+        swap_symlink(CHECKOUT, current_path)
+
+def activate(persistent_dir, target):
+    """Atomically points 'current' at target ('.' or a path below the persistent dir)."""
+    ensure_current_link(persistent_dir)
+    with tracing.span("activate", "fs", path=target):
+        swap_symlink(target, os.path.join(persistent_dir, CURRENT_LINK))
+
+# --- Reconcile Engine ---
+# Instead of removing every managed symlink and recreating it, the current state of
+# ~/.config is compared with the desired state and only differing entries are touched.
+# Symlinks are swapped atomically (symlink to a temp name + rename over the target),
+# so a config never disappears while programs watching ~/.config are running.
+
+STATUS_ENABLED = "enabled"
+STATUS_EXTERNAL = "enabled (external)"
+STATUS_UNMANAGED = "unmanaged"
+STATUS_DISABLED = "disabled"
+STATUS_MISSING = "source missing"
+
+LINK = "link"       # Create or retarget the symlink
+UNLINK = "unlink"   # Remove the symlink
+REPLACE = "replace" # Remove a non-symlink target, then link (only planned with force=True)
+SKIP = "skip"       # Target exists and is not a symlink; left alone
+
+Action = namedtuple("Action", ["op", "cfg", "source", "target"])
+
+def config_status(persistent_dir, cfg):
+    """Returns the status of a config in ~/.config as one of the STATUS_* values."""
+    source_path = get_source_path(persistent_dir, cfg)
+    target_path = os.path.join(CONFIG_DIR, cfg)
+
+    active_source = os.path.join(persistent_dir, get_active_target(persistent_dir), "config", cfg)
+    if not os.path.isdir(active_source):
+        return STATUS_MISSING
+    if os.path.islink(target_path):
+        link = os.readlink(target_path)
+        if link in (source_path, get_legacy_source_path(persistent_dir, cfg)):
+            return STATUS_ENABLED
+        return STATUS_EXTERNAL
+    if os.path.exists(target_path):
+        return STATUS_UNMANAGED
+    return STATUS_DISABLED
+
+def plan_configs(persistent_dir, desired, force=False, remove_external=False):
+    """
+    Computes the actions needed to reach the desired state.
+    desired maps config names to True (linked) or False (not linked). Configs already in
+    the desired state produce no action. force replaces unmanaged targets and
+    remove_external also removes symlinks that point outside the repository.
+    """
+    plan = []
+    for cfg, enabled in desired.items():
+        source_path = get_source_path(persistent_dir, cfg)
         target_path = os.path.join(CONFIG_DIR, cfg)
+        status = config_status(persistent_dir, cfg)
 
-        if os.path.isdir(source_path):
-            if os.path.exists(target_path) and not os.path.islink(target_path):
-                info(f"Skipping {target_path}: exists and is not a symlink. Please move or remove it manually if you want to symlink.")
+        if enabled:
+            if status == STATUS_MISSING:
                 continue
-            elif os.path.islink(target_path):
-                # If it's already a symlink, ensure it points to the correct place
-                if os.readlink(target_path) == source_path:
-                    info(f"Symlink for {cfg} already exists and is correct.")
-                    continue
+            if status == STATUS_ENABLED:
+                # Links from older installs are moved over to point through 'current'
+                if os.readlink(target_path) != source_path:
+                    plan.append(Action(LINK, cfg, source_path, target_path))
+                continue
+            if status == STATUS_UNMANAGED:
+                plan.append(Action(REPLACE if force else SKIP, cfg, source_path, target_path))
+            else:
+                plan.append(Action(LINK, cfg, source_path, target_path))
+        elif status == STATUS_ENABLED or (status == STATUS_EXTERNAL and remove_external):
+            plan.append(Action(UNLINK, cfg, source_path, target_path))
+        elif status == STATUS_MISSING and os.path.islink(target_path) and remove_external:
+            plan.append(Action(UNLINK, cfg, source_path, target_path))
+    return plan
+
+def swap_symlink(source_path, target_path):
+    """Points target_path at source_path by renaming a new symlink over it."""
+    tmp_path = f"{target_path}.serein-tmp"
+    if os.path.lexists(tmp_path):
+        os.remove(tmp_path)
+    os.symlink(source_path, tmp_path)
+    os.replace(tmp_path, target_path)
+
+def apply_plan(plan):
+    """Applies the actions of a plan. Returns the number of filesystem changes made."""
+    changes = 0
+    for action in plan:
+        if action.op == SKIP:
+            info(f"Skipping {action.target}: exists and is not a symlink. Please move or remove it manually if you want to symlink.")
+            continue
+        try:
+            with tracing.span(action.op, "fs", path=action.target):
+                if action.op == UNLINK:
+                    os.remove(action.target)
+                    info(f"Removed symlink: {action.target}")
                 else:
-                    info(f"Removing existing incorrect symlink for {cfg}.")
-                    os.remove(target_path)
-            
-            try:
-                os.symlink(source_path, target_path)
-                info(f"Symlinked {source_path} to {target_path}")
-            except OSError as e:
-                error(f"Failed to symlink {source_path} to {target_path}: {e}")
-        else:
-            info(f"Source directory for {cfg} not found: {source_path}. Skipping.")
+                    if action.op == REPLACE:
+                        shutil.rmtree(action.target)
+                    swap_symlink(action.source, action.target)
+                    info(f"Symlinked {action.source} to {action.target}")
+            changes += 1
+        except OSError as e:
+            error(f"Failed to {action.op} {action.target}: {e}")
+    return changes
+
+def reconcile_configs(persistent_dir, desired=None):
+    """Brings ~/.config in line with the desired state (all managed configs linked by default)."""
+    if desired is None:
+        desired = {cfg: True for cfg in get_configs_to_manage(persistent_dir)}
+    os.makedirs(CONFIG_DIR, exist_ok=True)
+    ensure_current_link(persistent_dir)
+    plan = plan_configs(persistent_dir, desired)
+    changes = apply_plan(plan)
+    if changes == 0:
+        info("All configurations are already up to date.")
+    return changes
+
+def symlink_configs(persistent_dir):
+    info("Symlinking configurations...")
+    return reconcile_configs(persistent_dir)
 
 def unsymlink_configs(persistent_dir):
     info("Removing existing symlinks...")
-    REPO_CONFIG_DIR = os.path.join(persistent_dir, "config") # Define here as well
-    configs = get_configs_to_manage(persistent_dir)
-    for cfg in configs:
-        target_path = os.path.join(CONFIG_DIR, cfg)
-
-        if os.path.islink(target_path):
-            try:
-                os.remove(target_path)
-                info(f"Removed symlink: {target_path}")
-            except OSError as e:
-                error(f"Failed to remove symlink {target_path}: {e}")
-        elif os.path.exists(target_path):
-            info(f"Skipping {target_path}: exists but is not a symlink.")
-        else:
-            info(f"No symlink or directory found for {cfg} at {target_path}. Skipping.")
+    desired = {cfg: False for cfg in get_configs_to_manage(persistent_dir)}
+    return apply_plan(plan_configs(persistent_dir, desired, remove_external=True))
@@ -1,56 +1,108 @@
 #!/usr/bin/env python3
 
+import importlib
 import os
 import sys
-import typer
 
-# --- Dynamically add .venv site-packages to sys.path ---
-script_dir = os.path.dirname(os.path.abspath(__file__))
-# Assuming .venv is in the parent directory of the 'functions' directory
-venv_path = os.path.join(script_dir, '..', '.venv')
-
-# Find the site-packages directory within the virtual environment
-# This can vary slightly between Python versions (e.g., python3.8, python3.9)
-# We'll look for the first directory matching 'pythonX.Y' inside lib
-site_packages_path = None
-if os.path.isdir(venv_path):
-    lib_path = os.path.join(venv_path, 'lib')
-    if os.path.isdir(lib_path):
-        for entry in os.listdir(lib_path):
-            if entry.startswith('python') and os.path.isdir(os.path.join(lib_path, entry)):
+# --- Add .venv site-packages to sys.path ---
+# The launcher normally runs us inside the activated venv, in which case there is nothing to do.
+# Otherwise the site-packages path is derived from the interpreter version instead of scanning .venv/lib.
+if sys.prefix == sys.base_prefix:
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    # Assuming .venv is in the parent directory of the 'functions' directory
+    lib_path = os.path.join(script_dir, '..', '.venv', 'lib')
+    site_packages_path = os.path.join(lib_path, f'python{sys.version_info.major}.{sys.version_info.minor}', 'site-packages')
+
+    if not os.path.isdir(site_packages_path):
+        # The venv was created by a different interpreter; fall back to the first pythonX.Y we find
+        site_packages_path = None
+        if os.path.isdir(lib_path):
+            for entry in os.listdir(lib_path):
                 potential_site_packages = os.path.join(lib_path, entry, 'site-packages')
-                if os.path.isdir(potential_site_packages):
+                if entry.startswith('python') and os.path.isdir(potential_site_packages):
                     site_packages_path = potential_site_packages
                     break
 
-if site_packages_path and site_packages_path not in sys.path:
-    sys.path.insert(0, site_packages_path)
-# --- End dynamic .venv setup ---
+    if site_packages_path and site_packages_path not in sys.path:
+        sys.path.insert(0, site_packages_path)
+# --- End .venv setup ---
+
+import tracing
+
+if os.environ.get("SEREIN_TRACE"):
+    tracing.enable(os.environ["SEREIN_TRACE"])
+
+from typing import Optional
+from typing_extensions import Annotated
+
+import typer
+
+# --- Command Registry ---
+# Command modules are only imported when their command is invoked (or when listing help),
+# so e.g. 'serein config list' never pays for the update/rollback/pkg imports.
+
+# name -> (module, typer app attribute)
+COMMAND_GROUPS = {
+    "config": ("commands.config", "config_app"),
+    "pkg": ("commands.pkg", "pkg_app"),
+    "trace": ("commands.trace", "trace_app"),
+}
+
+# name -> (module, function attribute, help, persistent installs only)
+COMMANDS = {
+    "uninstall": ("commands.uninstall", "uninstall_command", "Uninstalls Serein, removing configurations and the command.", False),
+    "update": ("commands.update", "update_command", "Updates Serein to the latest version.", True),
+    "rollback": ("commands.rollback", "rollback_command", "Rolls back Serein to a previous generation or manages generations.", True),
+    "daemon": ("commands.daemon", "daemon_command", "Runs the state daemon that answers status queries over a Unix socket.", True),
+}
+
+def build_app(argv):
+    """Builds the typer app, registering only the invoked command when it can be identified from argv."""
+    app = typer.Typer(
+        name="serein",
+        help="Serein Command-Line Tool",
+        add_completion=False,
+        rich_help_panel="Custom Commands"
+    )
 
-from commands import utils, config, update, rollback, uninstall, pkg
+    # Also keeps typer in group mode when only a single command is registered
+    @app.callback()
+    def main(
+        trace: Annotated[Optional[str], typer.Option("--trace", metavar="FILE", help="Record a Chrome trace of this run to FILE (or set SEREIN_TRACE).")] = None
+    ):
+        if trace:
+            tracing.enable(trace)
 
-app = typer.Typer(
-    name="serein",
-    help="Serein Command-Line Tool",
-    add_completion=False,
-    rich_help_panel="Custom Commands"
-)
+    if argv and argv[0] == "--trace":
+        argv = argv[2:]
+    elif argv and argv[0].startswith("--trace="):
+        argv = argv[1:]
+    requested = argv[0] if argv and not argv[0].startswith("-") else None
+    if requested in COMMAND_GROUPS or requested in COMMANDS:
+        names = [requested]
+    else:
+        names = list(COMMAND_GROUPS) + list(COMMANDS)
 
-# Add the config command group
-app.add_typer(config.config_app, name="config")
-app.add_typer(pkg.pkg_app, name="pkg")
+    for name in names:
+        if name in COMMAND_GROUPS:
+            module_name, attribute = COMMAND_GROUPS[name]
+            app.add_typer(getattr(importlib.import_module(module_name), attribute), name=name)
+            continue
 
-# Add other commands
-app.command(name="uninstall", help="Uninstalls Serein, removing configurations and the command.")(uninstall.uninstall_command)
+        module_name, attribute, help_text, persistent_only = COMMANDS[name]
+        # Hide persistent-only commands from the listing; an explicit invocation reports the error itself.
+        if persistent_only and name != requested:
+            from commands import utils
+            if not utils.is_persistent_install():
+                continue
+        app.command(name=name, help=help_text)(getattr(importlib.import_module(module_name), attribute))
 
-# Conditionally add commands that only work for persistent installations
-if utils.is_persistent_install():
-    app.command(name="update", help="Updates Serein to the latest version.")(update.update_command)
-    app.command(name="rollback", help="Rolls back Serein to a previous generation or manages generations.")(rollback.rollback_command)
+    return app
 
 if __name__ == "__main__":
     try:
-        app(prog_name="serein")
+        build_app(sys.argv[1:])(prog_name="serein")
     except KeyboardInterrupt:
+        from commands import utils
         utils.info("Operation cancelled by user.")
         sys.exit(0)
@@ -0,0 +1,98 @@
+# Lightweight tracing for serein, enabled with 'serein --trace FILE' or SEREIN_TRACE=FILE.
+#
+# Spans are recorded as Chrome trace-event "complete" events and written when the process
+# exits, so the file can be opened in chrome://tracing or https://ui.perfetto.dev, or
+# summarised with 'serein trace summary FILE'. When tracing is off, span() only costs a
+# global lookup. Stdlib only, so resymlink and the command modules can both use it.
+
+import atexit
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+_events = None # None while tracing is disabled
+_path = None
+_start = None
+_lanes = itertools.count(1000) # Synthetic thread ids for overlapping async commands
+_lock = threading.Lock()
+
+
+def _now_us():
+    return (time.perf_counter() - _start) * 1e6
+
+
+def enabled():
+    return _events is not None
+
+
+def enable(path):
+    """Starts recording spans; the trace is written to path when the process exits."""
+    global _events, _path, _start
+    if _events is not None:
+        _path = path
+        return
+    _events = []
+    _path = path
+    _start = time.perf_counter()
+    atexit.register(write)
+
+
+def new_lane(name):
+    """Returns a fresh thread id for spans that overlap others on the same thread, labelled name."""
+    lane = next(_lanes)
+    if _events is not None:
+        with _lock:
+            _events.append({"ph": "M", "name": "thread_name", "pid": os.getpid(), "tid": lane, "args": {"name": name}})
+    return lane
+
+
+@contextmanager
+def span(name, category="step", lane=None, **args):
+    """
+    Records the duration of the with-block as a span. Yields the args dict, so results
+    (exit codes, byte counts) can be attached before the block ends.
+    """
+    if _events is None:
+        yield args
+        return
+    begin = _now_us()
+    try:
+        yield args
+    except BaseException as e:
+        args["error"] = type(e).__name__
+        raise
+    finally:
+        event = {
+            "ph": "X", "name": name, "cat": category, "ts": begin, "dur": _now_us() - begin,
+            "pid": os.getpid(), "tid": lane if lane is not None else threading.get_ident() % 1000,
+            "args": {key: value for key, value in args.items() if value is not None},
+        }
+        with _lock:
+            _events.append(event)
+
+
+def write():
+    """Writes the recorded spans, plus one span covering the whole run, to the trace file."""
+    if _events is None or not _path:
+        return
+    root = {
+        "ph": "X", "name": "serein " + " ".join(sys.argv[1:]), "cat": "process", "ts": 0, "dur": _now_us(),
+        "pid": os.getpid(), "tid": threading.get_ident() % 1000, "args": {},
+    }
+    try:
+        with open(_path, "w") as f:
+            json.dump({"traceEvents": [root] + _events, "displayTimeUnit": "ms"}, f)
+    except OSError as e:
+        print(f"serein: could not write trace to {_path}: {e}", file=sys.stderr)
+
+
+def load(path):
+    """Returns the complete ("X") events of a trace file."""
+    with open(path, "r") as f:
+        data = json.load(f)
+    events = data["traceEvents"] if isinstance(data, dict) else data
+    return [event for event in events if event.get("ph") == "X"]